@@ -0,0 +1,106 @@
+import os
+import glob
+import json
+import argparse
+from time import perf_counter
+from src.utils import extract_predictions
+from src.model_registry import get_registry
+from src.tiling import MERGE_METHODS, predict_tiled, tiled_predictions_to_records
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def collect_images(source: str) -> list[str]:
+    """
+    Function returns sorted list of paths to images from a folder or matching a glob pattern.
+    """
+    if os.path.isdir(source):
+        paths = (os.path.join(source, file) for file in os.listdir(source))
+    else:
+        paths = glob.glob(source, recursive=True)
+
+    return sorted(path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path))
+
+
+def batched(items: list, batch_size: int):
+    """
+    Function yields consecutive slices of the list with batch_size elements.
+    """
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def iter_predictions(model, images: list[str], args: argparse.Namespace, predict_kwargs: dict):
+    """
+    Function runs the model on images in batches, or on tiles of every image in batches if tile size is set.
+    return: generator of tuples with path to an image and list of prediction records.
+    """
+    if args.tile_size is None:
+        for batch in batched(images, args.batch_size):
+            results = model.predict(source=batch, batch=len(batch), **predict_kwargs)
+            for path_to_image, result in zip(batch, results):
+                yield path_to_image, extract_predictions(result, model.names)
+        return
+
+    tiled_kwargs = {key: value for key, value in predict_kwargs.items() if key not in ("conf", "iou", "imgsz", "verbose")}
+    for path_to_image in images:
+        boxes, scores, classes = predict_tiled(model, path_to_image, tile_size=args.tile_size, overlap=args.tile_overlap,
+                                               batch_size=args.batch_size, conf=args.conf, iou=args.iou,
+                                               merge=args.merge, **tiled_kwargs)
+        yield path_to_image, tiled_predictions_to_records(boxes, scores, classes, model.names)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Detect planes on a batch of images and write predictions as JSON Lines.")
+    parser.add_argument("--model", required=True, help="name of a model folder in runs/detect")
+    parser.add_argument("--source", required=True, help="folder with images or glob pattern")
+    parser.add_argument("--batch-size", type=int, default=8, help="number of images (or tiles in tiled mode) in one forward pass")
+    parser.add_argument("--output", default="predictions.jsonl", help="path to the output .jsonl file")
+    parser.add_argument("--conf", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold of NMS")
+    parser.add_argument("--imgsz", type=int, default=None, help="inference image size, model default if not set")
+    parser.add_argument("--device", default=None, help="device to run on, for example cpu or 0")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="enables tiled inference of large images with square tiles of this size")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="fraction of tile size by which tiles overlap")
+    parser.add_argument("--merge", choices=MERGE_METHODS, default="nms",
+                        help="method used to merge boxes on overlapping tiles")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.batch_size < 1:
+        raise ValueError("Batch size has to be positive integer")
+
+    images = collect_images(args.source)
+    if not images:
+        raise ValueError(f"No images found in {args.source}")
+
+    time_start = perf_counter()
+    model = get_registry().get_model(args.model)
+    load_time = perf_counter() - time_start
+
+    predict_kwargs = {"conf": args.conf, "iou": args.iou, "verbose": False}
+    if args.imgsz is not None:
+        predict_kwargs["imgsz"] = args.imgsz
+    if args.device is not None:
+        predict_kwargs["device"] = args.device
+
+    number_of_detections = 0
+    time_start = perf_counter()
+    with open(args.output, "w", encoding="utf-8") as file:
+        for path_to_image, predictions in iter_predictions(model, images, args, predict_kwargs):
+            number_of_detections += len(predictions)
+            file.write(json.dumps({"image": path_to_image, "predictions": predictions}) + "\n")
+    inference_time = perf_counter() - time_start
+
+    print(f"Model {args.model} loaded in {load_time:.2f} seconds.")
+    print(f"Processed {len(images)} images ({number_of_detections} planes) in {inference_time:.2f} seconds, "
+          f"{len(images) / inference_time:.2f} images/sec, batch size {args.batch_size}.")
+    print(f"Predictions saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import csv
+import argparse
+from datetime import datetime
+from time import perf_counter
+import numpy as np
+import torch
+from ultralytics import YOLO
+from src.utils import PATH_TO_IMAGES, get_models, get_images
+from src.model_registry import get_registry
+from src.tiling import read_image_array
+
+
+CSV_COLUMNS = ("timestamp", "model", "device", "threads", "imgsz", "batch_size", "load_time_s", "warmup_time_s",
+               "images", "latency_p50_ms", "latency_p90_ms", "latency_p99_ms", "amortized_ms_per_image_p50",
+               "amortized_ms_per_image_p90", "amortized_ms_per_image_p99", "throughput_img_s")
+
+
+def read_images(path_to_images: str, image_names: list[str]) -> list[np.ndarray]:
+    """
+    Function decodes images once to BGR arrays expected by ultralytics, so decoding is not measured.
+    """
+    return [np.ascontiguousarray(read_image_array(os.path.join(path_to_images, name))[..., ::-1]) for name in image_names]
+
+
+def benchmark_configuration(model: YOLO, images: list[np.ndarray], imgsz: int, batch_size: int, warmup: int,
+                            repeats: int, device: str) -> dict:
+    """
+    Function measures warm-up time and latency of the model with given image size and batch size.
+    Result of an image is ready when its whole batch is processed, so latency of every image is the time of its batch.
+    Amortized time per image is the time of the batch divided by the batch size, it shows cost and not latency.
+    return: dict with warm-up time, per image latency percentiles, amortized time per image percentiles and throughput.
+    """
+    predict_kwargs = {"imgsz": imgsz, "device": device, "verbose": False}
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+
+    time_start = perf_counter()
+    for _ in range(warmup):
+        model.predict(source=batches[0], batch=len(batches[0]), **predict_kwargs)
+    warmup_time = perf_counter() - time_start
+
+    image_latencies, amortized_times = [], []
+    time_start = perf_counter()
+    for _ in range(repeats):
+        for batch in batches:
+            time_batch = perf_counter()
+            model.predict(source=batch, batch=len(batch), **predict_kwargs)
+            latency = perf_counter() - time_batch
+            image_latencies.extend([latency] * len(batch))
+            amortized_times.extend([latency / len(batch)] * len(batch))
+    total_time = perf_counter() - time_start
+
+    image_latencies = np.array(image_latencies) * 1000
+    amortized_times = np.array(amortized_times) * 1000
+    return {
+        "warmup_time_s": round(warmup_time, 4),
+        "images": len(image_latencies),
+        **{f"latency_p{q}_ms": round(float(np.percentile(image_latencies, q)), 3) for q in (50, 90, 99)},
+        **{f"amortized_ms_per_image_p{q}": round(float(np.percentile(amortized_times, q)), 3) for q in (50, 90, 99)},
+        "throughput_img_s": round(len(image_latencies) / total_time, 3)
+    }
+
+
+def benchmark_model(model_name: str, images: list[np.ndarray], args: argparse.Namespace) -> list[dict]:
+    """
+    Function loads the model from its weights, without the registry cache, and benchmarks it
+    for every combination of image size and batch size.
+    return: list of rows of the results table.
+    """
+    weights = get_registry().get_info(model_name)["weights"]
+    time_start = perf_counter()
+    model = YOLO(weights)
+    load_time = perf_counter() - time_start
+
+    rows = []
+    for imgsz in args.imgsz:
+        for batch_size in args.batch_sizes:
+            result = benchmark_configuration(model, images, imgsz, batch_size, args.warmup, args.repeats, args.device)
+            row = {"timestamp": datetime.now().isoformat(timespec="seconds"), "model": model_name,
+                   "device": args.device, "threads": torch.get_num_threads(), "imgsz": imgsz,
+                   "batch_size": batch_size, "load_time_s": round(load_time, 4), **result}
+            print(f"{model_name} imgsz={imgsz} batch={batch_size}: latency p50 {row['latency_p50_ms']} ms, "
+                  f"p99 {row['latency_p99_ms']} ms, amortized p50 {row['amortized_ms_per_image_p50']} ms/image, "
+                  f"{row['throughput_img_s']} images/sec")
+            rows.append(row)
+
+    return rows
+
+
+def write_rows(path_to_output: str, rows: list[dict]) -> None:
+    """
+    Function appends rows to the CSV table, header is written if the file is new,
+    so results of different runs are kept in one table.
+    """
+    is_new_file = not os.path.exists(path_to_output) or os.path.getsize(path_to_output) == 0
+    if not is_new_file:
+        with open(path_to_output, "r", encoding="utf-8", newline="") as file:
+            if next(csv.reader(file), []) != list(CSV_COLUMNS):
+                raise ValueError(f"Columns of {path_to_output} are different, results have to be written to a new file")
+    with open(path_to_output, "a", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+        if is_new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark load time, latency and throughput of trained models on test images.")
+    parser.add_argument("--models", nargs="+", default=None, help="names of model folders in runs/detect, all models if not set")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8], help="batch sizes to benchmark")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640, 800], help="inference image sizes to benchmark")
+    parser.add_argument("--warmup", type=int, default=2, help="number of not measured forward passes before measuring")
+    parser.add_argument("--repeats", type=int, default=3, help="number of measured passes over all test images")
+    parser.add_argument("--device", default="cpu", help="device to run on, for example cpu or 0")
+    parser.add_argument("--threads", type=int, default=None, help="number of torch CPU threads, torch default if not set")
+    parser.add_argument("--output", default="benchmark.csv", help="path to the CSV table results are appended to")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if min(args.batch_sizes) < 1 or args.repeats < 1 or args.warmup < 0:
+        raise ValueError("Batch sizes and repeats have to be positive integers, warmup non-negative integer")
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    models = args.models or get_models()
+    image_names = get_images()
+    images = read_images(PATH_TO_IMAGES, image_names)
+    print(f"Benchmarking {len(models)} models on {len(images)} images from {PATH_TO_IMAGES}")
+
+    for model_name in models:
+        rows = benchmark_model(model_name, images, args)
+        write_rows(args.output, rows)
+
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
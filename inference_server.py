@@ -0,0 +1,140 @@
+import io
+import json
+import queue
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from src.utils import extract_predictions
+from src.model_registry import get_registry
+from src.batching import DynamicBatcher
+
+
+REQUEST_TIMEOUT = 60 # Seconds to wait for the batch with the request to be processed
+
+
+def make_predict_batch(model, conf: float, iou: float, imgsz: int=None):
+    """
+    Function returns function that runs the model on CPU on a list of images and returns prediction records for each image.
+    """
+    predict_kwargs = {"conf": conf, "iou": iou, "device": "cpu", "verbose": False}
+    if imgsz is not None:
+        predict_kwargs["imgsz"] = imgsz
+
+    def predict_batch(images: list[np.ndarray]) -> list[list[dict]]:
+        results = model.predict(source=images, batch=len(images), **predict_kwargs)
+        return [extract_predictions(result, model.names) for result in results]
+
+    return predict_batch
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """
+    Function decodes uploaded image to BGR array expected by ultralytics.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        return np.ascontiguousarray(np.asarray(image.convert("RGB"))[..., ::-1])
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the inference server.
+    POST /predict with image bytes in the body returns JSON with list of detected planes,
+    GET /metrics returns latency and batch size metrics, GET /health returns status of the server.
+    """
+    batcher: DynamicBatcher = None
+    model_name: str = None
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self.__send_json(200, self.batcher.metrics)
+        elif self.path == "/health":
+            self.__send_json(200, {"status": "ok", "model": self.model_name})
+        else:
+            self.__send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.__send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self.__send_json(400, {"error": "Content-Length header has to be an integer"})
+            return
+        if length <= 0:
+            self.__send_json(400, {"error": "Request body has to contain an image"})
+            return
+
+        try:
+            image = decode_image(self.rfile.read(length))
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            self.__send_json(400, {"error": "Request body is not a valid image"})
+            return
+
+        try:
+            future = self.batcher.submit(image)
+        except queue.Full:
+            self.__send_json(503, {"error": "Server is overloaded, try again later"})
+            return
+
+        try:
+            predictions = future.result(timeout=REQUEST_TIMEOUT)
+        except Exception as error:
+            self.__send_json(500, {"error": str(error)})
+            return
+
+        self.__send_json(200, {"predictions": predictions})
+
+    def __send_json(self, status: int, content: dict):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Access log of every request slows down load tests
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local CPU inference server with dynamic request batching.")
+    parser.add_argument("--model", required=True, help="name of a model folder in runs/detect")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=8, help="maximum number of images in one forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=10, help="time to wait for more requests to fill a batch")
+    parser.add_argument("--max-queue-size", type=int, default=64, help="maximum number of waiting requests")
+    parser.add_argument("--conf", type=float, default=0.25, help="confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold of NMS")
+    parser.add_argument("--imgsz", type=int, default=None, help="inference image size, model default if not set")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    model = get_registry().get_model(args.model)
+    batcher = DynamicBatcher(make_predict_batch(model, args.conf, args.iou, args.imgsz),
+                             max_batch_size=args.max_batch_size,
+                             max_wait=args.max_wait_ms / 1000,
+                             max_queue_size=args.max_queue_size)
+    batcher.start()
+
+    InferenceRequestHandler.batcher = batcher
+    InferenceRequestHandler.model_name = args.model
+    server = ThreadingHTTPServer((args.host, args.port), InferenceRequestHandler)
+    print(f"Serving {args.model} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,27 @@
 import os
 from pprint import pprint
-from src.utils import choose_model, choose_image
+from src.utils import choose_model, choose_image, extract_predictions
+from src.model_registry import get_registry
+from src.prediction_cache import PREDICTION_CACHE_DIR, PredictionCache
 
 
 PATH_TO_SAVE = "/home/bohdan/code/projects/aircraft-classification/detection-results"
+USE_PREDICTION_CACHE = False # Set to True to cache detections, so other thresholds can be tried without running the model
 
 
 model, model_name = choose_model()
 path_to_image = choose_image()
 
-results = model.predict(source=path_to_image, conf=0.25, iou=0.5)
-
-results[0].save(filename=os.path.join(PATH_TO_SAVE, f"{os.path.splitext(os.path.basename(path_to_image))[0]}-{model_name}.jpg"))
-
-prediction_results = []
-for result in results:
-    boxes = result.boxes
-    if boxes is not None:
-        for i, box in enumerate(boxes):
-            class_id = int(box.cls[0])
-            class_name = model.names[class_id]
-            confidence = float(box.conf[0])
-            coords = box.xyxy[0].tolist()
-            x1, y1, x2, y2 = coords
-            center = (round((x1+x2)/2), round((y1+y2)/2))
-            prediction_results.append({"class_name": class_name,
-                                       "confidence": confidence,
-                                       "center_coordinates": center})
+if USE_PREDICTION_CACHE:
+    print(f"Detections are cached in {PREDICTION_CACHE_DIR}")
+    result = PredictionCache().predict_result(model, get_registry().get_info(model_name)["weights"], path_to_image,
+                                              conf=0.25, iou=0.5)
+else:
+    result = model.predict(source=path_to_image, conf=0.25, iou=0.5)[0]
+
+result.save(filename=os.path.join(PATH_TO_SAVE, f"{os.path.splitext(os.path.basename(path_to_image))[0]}-{model_name}.jpg"))
+
+prediction_results = extract_predictions(result, model.names)
 pprint(prediction_results)
 
-results[0].show()
\ No newline at end of file
+result.show()
\ No newline at end of file
@@ -1,9 +1,27 @@
 import os
 import random
 import json
-from time import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from itertools import repeat
+from typing import Iterable
+from time import time, perf_counter
+import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 from utils import add_gaussian_noise
+from sprite_cache import SpriteCache
+from asset_store import AssetStore
+from dataset_shards import ShardWriter, read_image_numbers, read_meta
+from progress_journal import JOURNAL_FILE_NAME, ProgressJournal, read_journal, is_image_complete
+from stage_timer import StageTimer
+from async_writer import IMAGE_CODECS, AsyncImageWriter, encode_image
+from interference import Interference
+from placement import MAX_COVERAGE, FootprintGrid, rotated_size
+from plane_sampler import ClassBalancedSampler, get_class_name, format_class_histogram
+from compositing import (image_to_array, array_to_image, adjust_color, adjust_brightness,
+                         adjust_contrast, adjust_sharpness, gaussian_blur, alpha_blend, to_uint8,
+                         affine_region, affine_coefficients, warp_sprite, alpha_box)
 
 
 CLASSES_NAMES_MAPPING_PATH = "data/artifitial-data/plane-images-v3/class_names_to_id_mapping.json"
@@ -11,13 +29,29 @@ CLASSES_NAMES_MAPPING_PATH = "data/artifitial-data/plane-images-v3/class_names_t
 with open(CLASSES_NAMES_MAPPING_PATH, "r", encoding="utf-8") as file:
     CLASSES_NAMES_MAPPING = json.load(file)
 
+COMPOSITING_BACKENDS = ("pil", "numpy")
+OUTPUT_FORMATS = ("folder", "shards")
+ROTATION_MODES = ("prerotated", "affine")
+MANIFEST_VERSION = 1
+
 
 class PlaneImage:
-    def __init__(self, image: Image, width: float, plane_id: str):
+    def __init__(self, image: Image, width: float, plane_id: str, sprite_key: tuple=None, sprite_cache: SpriteCache=None,
+                 image_parameters: dict=None, angle: float=None):
+        """
+        :param image_parameters: dict with parameters of variation of the plane image, see generate_image_parameters,
+        generated randomly when the plane is drawn if None.
+        :param angle: float angle in degrees by which not rotated image is rotated counterclockwise with affine warp
+        when it is placed, None if the image is already rotated.
+        """
         self.image = image.copy()
         self.class_index = plane_id
+        self.angle: float = angle
         self.__meter_width = width
         self.__pixel_size: tuple = None
+        self.__sprite_key: tuple = sprite_key
+        self.__sprite_cache: SpriteCache = sprite_cache
+        self.__image_parameters: dict = image_parameters
 
     @property
     def pixel_width(self) -> int:
@@ -56,6 +90,15 @@ class PlaneImage:
         # shadow_blur = random.uniform(0.95, 1.05) * shadow_parameters["blur"]
         # shadow_transparency = random.uniform(0.95, 1.05) * shadow_parameters["transparency"]
 
+        shadow = self.__vary_shadow_image(shadow_parameters)
+        shadow = shadow.resize(self.__pixel_size)
+
+        return shadow
+
+    def __vary_shadow_image(self, shadow_parameters: dict) -> Image:
+        """
+        Function applies shadow parameters to the image of original size.
+        """
         r, g, b, a = self.image.split()
         a = a.point(lambda p: p*shadow_parameters["transparency"])
         shadow = Image.merge("RGBA", (r, g, b, a))
@@ -64,53 +107,201 @@ class PlaneImage:
         shadow = ImageEnhance.Brightness(shadow).enhance(shadow_parameters["brightness"])
         shadow = ImageEnhance.Contrast(shadow).enhance(shadow_parameters["contrast"])
         shadow = ImageEnhance.Sharpness(shadow).enhance(shadow_parameters["sharpness"])
-        shadow = shadow.filter(ImageFilter.GaussianBlur(radius=shadow_parameters["blur"]))
+        return shadow.filter(ImageFilter.GaussianBlur(radius=shadow_parameters["blur"]))
+    
+    def get_shadow_array(self, shadow_parameters: dict) -> np.ndarray:
+        """
+        Function makes shadow like get_shadow_image, but with NumPy operations on the image already resized to the pixel size.
+        Blur radius is scaled by the resize factor to match the blur applied to the full size image.
+        return: float32 RGBA array of the shadow.
+        """
+        shadow, alpha, scale = self.__get_resized_array()
+        shadow[..., 3:] = alpha * shadow_parameters["transparency"]
 
-        shadow = shadow.resize(self.__pixel_size)
+        rgb = shadow[..., :3]
+        adjust_color(rgb, shadow_parameters["saturation"])
+        adjust_brightness(rgb, shadow_parameters["brightness"])
+        adjust_contrast(rgb, shadow_parameters["contrast"])
+        adjust_sharpness(rgb, shadow_parameters["sharpness"])
+
+        return gaussian_blur(shadow, shadow_parameters["blur"] * scale)
 
-        return shadow
-    
     def get_plane_image(self) -> Image:
         """
         Function makes small variation to an original image
         return: PIL.Image object.
         """
-        image_saturation = random.uniform(0.8, 1.2)
-        image_brightness = random.uniform(0.8, 1.2)
-        image_contrast = random.uniform(0.8, 1.2)
-        image_sharpness = random.uniform(0.4, 1.6)
+        image = self.__vary_plane_image()
+        image = image.resize(self.__pixel_size)
+
+        return image
+
+    def __vary_plane_image(self) -> Image:
+        """
+        Function makes small variation to the image of original size.
+        """
+        image_parameters = self.__image_parameters or self.generate_image_parameters()
 
         image = self.image
 
         r, g, b, a = image.split()
-        a = a.filter(ImageFilter.GaussianBlur(radius=random.uniform(0.5, 3))) # Makes edges of plane blured and not too clear 
+        a = a.filter(ImageFilter.GaussianBlur(radius=image_parameters["blur"])) # Makes edges of plane blured and not too clear 
         image = Image.merge("RGBA", (r, g, b, a))
 
-        image = ImageEnhance.Color(image).enhance(image_saturation)
-        image = ImageEnhance.Brightness(image).enhance(image_brightness)
-        image = ImageEnhance.Contrast(image).enhance(image_contrast)
-        image = ImageEnhance.Sharpness(image).enhance(image_sharpness)
+        image = ImageEnhance.Color(image).enhance(image_parameters["saturation"])
+        image = ImageEnhance.Brightness(image).enhance(image_parameters["brightness"])
+        image = ImageEnhance.Contrast(image).enhance(image_parameters["contrast"])
+        return ImageEnhance.Sharpness(image).enhance(image_parameters["sharpness"])
 
-        image = image.resize(self.__pixel_size)
+    def get_plane_array(self) -> np.ndarray:
+        """
+        Function makes small variation to an original image like get_plane_image,
+        but with NumPy operations on the image already resized to the pixel size.
+        return: float32 RGBA array of the plane.
+        """
+        image_parameters = self.__image_parameters or self.generate_image_parameters()
+
+        image, alpha, scale = self.__get_resized_array()
+        image[..., 3:] = gaussian_blur(alpha, image_parameters["blur"] * scale)
+
+        rgb = image[..., :3]
+        adjust_color(rgb, image_parameters["saturation"])
+        adjust_brightness(rgb, image_parameters["brightness"])
+        adjust_contrast(rgb, image_parameters["contrast"])
+        adjust_sharpness(rgb, image_parameters["sharpness"])
 
         return image
 
+    def get_warped_shadow_image(self, shadow_parameters: dict, center: tuple[float, float],
+                                canvas_size: tuple[int, int]) -> tuple[Image, tuple] | tuple[None, None]:
+        """
+        Function makes shadow like get_shadow_image and scales, rotates by the angle and moves it to the center
+        with one affine warp into the region of the canvas it covers.
+        return: tuple with PIL.Image object of the region and tuple with its left, top, right and bottom coordinates,
+        or tuple of None values if the shadow is outside of the canvas.
+        """
+        region = affine_region(center, self.__pixel_size, self.angle, canvas_size)
+        if region is None:
+            return None, None
+        return self.__warp_image(self.__vary_shadow_image(shadow_parameters), center, region), region
+
+    def get_warped_plane_image(self, center: tuple[float, float],
+                               canvas_size: tuple[int, int]) -> tuple[Image, tuple] | tuple[None, None]:
+        """
+        Function makes plane image like get_plane_image and scales, rotates by the angle and moves it to the center
+        with one affine warp into the region of the canvas it covers.
+        return: tuple with PIL.Image object of the region and tuple with its coordinates, see get_warped_shadow_image.
+        """
+        region = affine_region(center, self.__pixel_size, self.angle, canvas_size)
+        if region is None:
+            return None, None
+        return self.__warp_image(self.__vary_plane_image(), center, region), region
+
+    def get_warped_shadow_array(self, shadow_parameters: dict, center: tuple[float, float],
+                                canvas_size: tuple[int, int]) -> tuple[np.ndarray, tuple] | tuple[None, None]:
+        """
+        Function makes shadow like get_shadow_array and rotates it by the angle around the center
+        into the region of the canvas it covers. Scaling is done by the cached resize, so only rotation is warped.
+        return: tuple with float32 RGBA array of the region and tuple with its coordinates, see get_warped_shadow_image.
+        """
+        region = affine_region(center, self.__pixel_size, self.angle, canvas_size)
+        if region is None:
+            return None, None
+        return self.__warp_array(self.get_shadow_array(shadow_parameters), center, region), region
+
+    def get_warped_plane_array(self, center: tuple[float, float],
+                               canvas_size: tuple[int, int]) -> tuple[np.ndarray, tuple] | tuple[None, None]:
+        """
+        Function makes plane like get_plane_array and rotates it by the angle around the center
+        into the region of the canvas it covers.
+        return: tuple with float32 RGBA array of the region and tuple with its coordinates, see get_warped_shadow_image.
+        """
+        region = affine_region(center, self.__pixel_size, self.angle, canvas_size)
+        if region is None:
+            return None, None
+        return self.__warp_array(self.get_plane_array(), center, region), region
+
+    def __warp_image(self, image: Image, center: tuple[float, float], region: tuple) -> Image:
+        """
+        Function warps image of original size into the region, images much larger than the pixel size
+        are first reduced by integer factor because bilinear warp takes only four pixels of the source for every output pixel.
+        """
+        reduce_factor = min(image.width // self.__pixel_size[0], image.height // self.__pixel_size[1])
+        if reduce_factor > 1:
+            image = image.reduce(reduce_factor)
+
+        x0, y0, x1, y1 = region
+        x_center, y_center = center
+        coefficients = affine_coefficients(image.size, self.__pixel_size, self.angle, (x_center - x0, y_center - y0))
+        return image.transform((x1 - x0, y1 - y0), Image.AFFINE, coefficients, resample=Image.BILINEAR)
+
+    def __warp_array(self, array: np.ndarray, center: tuple[float, float], region: tuple) -> np.ndarray:
+        x0, y0, x1, y1 = region
+        x_center, y_center = center
+        coefficients = affine_coefficients(self.__pixel_size, self.__pixel_size, self.angle, (x_center - x0, y_center - y0))
+        return warp_sprite(array, coefficients, (x1 - x0, y1 - y0))
+
+    @staticmethod
+    def generate_image_parameters() -> dict:
+        """
+        Function randomly generates parameters of small variation of the plane image.
+        """
+        return {
+            "saturation": random.uniform(0.8, 1.2),
+            "brightness": random.uniform(0.8, 1.2),
+            "contrast": random.uniform(0.8, 1.2),
+            "sharpness": random.uniform(0.4, 1.6),
+            "blur": random.uniform(0.5, 3)
+        }
+
+    def __get_resized_array(self) -> tuple[np.ndarray, np.ndarray, float]:
+        """
+        Function returns image resized to the pixel size as float32 array.
+        Resized image is taken from the sprite cache if the plane has sprite key and cache,
+        so only random variation has to be applied to it.
+        return: tuple with writable copy of RGBA array, read only array of base alpha and resize factor.
+        """
+        scale = self.__pixel_size[0] / self.image.width
+        if self.__sprite_cache is None or self.__sprite_key is None:
+            image = image_to_array(self.image.resize(self.__pixel_size))
+            return image, image[..., 3:].copy(), scale
+
+        key = (*self.__sprite_key, self.__pixel_size)
+        image, alpha = self.__sprite_cache.get(key, lambda: self.image.resize(self.__pixel_size))
+        return image.copy(), alpha, scale
+
 
 class AirbaseImage:
-    def __init__(self, airbase_image: str, airbase_width: float, spawn_points: list, planes: list):
+    def __init__(self, airbase_image: str, airbase_width: float, spawn_points: list, planes: list, backend: str="pil",
+                 timer: StageTimer=None, interference: Interference=None, scene: dict=None):
+        """
+        :param spawn_points: list of tuples with x, y and plane type of points where planes are placed.
+        :param scene: dict with random parameters of the image sampled by ImageCreator.sample_scene,
+        if given spawn points are used without variation and parameters are not generated again.
+        """
         self.image: Image = airbase_image.copy()
         self.labels: list[str] = None
+        self.__backend: str = backend
+        self.__timer: StageTimer = timer if timer is not None else StageTimer(enabled=False)
+        self.__interference: Interference = None
+        if backend == "numpy":
+            self.__interference = interference if interference is not None else Interference()
         self.__pixel_size: tuple = self.image.size
         self.__airbase_width: float = airbase_width
 
-        self.__spawn_points: list[tuple[int, int, str]] = spawn_points
-        self.__modify_spawn_points()
+        self.__scene: dict = scene
+        if scene is None:
+            self.__spawn_points: list[tuple[int, int]] = self.modify_spawn_points(spawn_points)
+        else:
+            self.__spawn_points: list[tuple[int, int]] = [tuple(spawn_point) for spawn_point in scene["spawn_points"]]
 
         self.__planes: list[PlaneImage] = planes
         self.__calculate_plane_sizes()
 
-        self.__shadow_parameters: dict = None
-        self.__generate_shadow_parameters()
+        if scene is None:
+            self.__shadow_parameters: dict = self.generate_shadow_parameters()
+        else:
+            self.__shadow_parameters: dict = scene["shadow_parameters"]
 
     def __calculate_plane_sizes(self):
         """
@@ -121,21 +312,24 @@ class AirbaseImage:
         for plane in self.__planes:
             plane.calculate_pixel_size(airbase_pixel_width, airbase_meter_width)
 
-    def __modify_spawn_points(self):
+    @staticmethod
+    def modify_spawn_points(spawn_points: list) -> list[tuple[int, int]]:
         """
         Function slightly varies spawn points location coordinates and removes plane type from point data.
         """
-        for i, spawn_point in enumerate(self.__spawn_points):
-            x, y, _ = spawn_point
+        modified_spawn_points = []
+        for x, y, _ in spawn_points:
             x += random.randint(-3, 3)
             y += random.randint(-3, 3)
-            self.__spawn_points[i] = (x, y)
+            modified_spawn_points.append((x, y))
+        return modified_spawn_points
 
-    def __generate_shadow_parameters(self):
+    @staticmethod
+    def generate_shadow_parameters() -> dict:
         """
         Function randomly generates shadow parameters.
         """
-        self.__shadow_parameters = {
+        return {
             "saturation": random.uniform(0.05, 1),
             "brightness": random.uniform(0.1, 0.7),
             "contrast": random.uniform(0.1, 0.6),
@@ -158,6 +352,31 @@ class AirbaseImage:
 
         return f"{class_index} {x_center} {y_center} {width} {height}"
 
+    def __generate_box_label(self, class_index: str, box: tuple[int, int, int, int]) -> str:
+        """
+        Function generates label for the plane from its bounding box on the airbase image.
+        :param box: tuple with left, top, right and bottom coordinates of the box.
+        return: string with label in YOLOv8 format.
+        """
+        x0, y0, x1, y1 = box
+        image_width, image_height = self.__pixel_size
+        x_center = (x0 + x1) / 2 / image_width
+        y_center = (y0 + y1) / 2 / image_height
+        width = (x1 - x0) / image_width
+        height = (y1 - y0) / image_height
+
+        return f"{class_index} {x_center} {y_center} {width} {height}"
+
+    @staticmethod
+    def __offset_box(box: tuple | None, region: tuple) -> tuple | None:
+        """
+        Function moves box found in the region of the image to coordinates of the whole image.
+        """
+        if box is None:
+            return None
+        x0, y0, _, _ = region
+        return box[0] + x0, box[1] + y0, box[2] + x0, box[3] + y0
+
     def generate_labels(self) -> list[str]:
         """
         Function generates labels for all planes placed on the airbase.
@@ -178,13 +397,32 @@ class AirbaseImage:
         :param plane_image: PlaneImage object.
         :param shadow_parameters: dict containing shadow parameters.
         """
-        shadow = plane_image.get_shadow_image(self.__shadow_parameters)
+        if plane_image.angle is not None:
+            self.__place_warped_shadow(spawn_point, plane_image)
+            return
+
+        with self.__timer.stage("shadow"):
+            shadow = plane_image.get_shadow_image(self.__shadow_parameters)
         x, y = spawn_point
         x -= plane_image.pixel_width // 2
         y -= plane_image.pixel_height // 2
         x_offset, y_offset = self.__shadow_parameters["shadow_offset"]
-        self.image.paste(shadow, (x + x_offset, y + y_offset), shadow)
+        with self.__timer.stage("paste"):
+            self.image.paste(shadow, (x + x_offset, y + y_offset), shadow)
     
+    def __place_warped_shadow(self, spawn_point: tuple[int, int], plane_image: PlaneImage):
+        """
+        Function places shadow of the plane rotated with affine warp on the airbase image.
+        """
+        x, y = spawn_point
+        x_offset, y_offset = self.__shadow_parameters["shadow_offset"]
+        with self.__timer.stage("shadow"):
+            shadow, region = plane_image.get_warped_shadow_image(self.__shadow_parameters, (x + x_offset, y + y_offset),
+                                                                 self.__pixel_size)
+        if shadow is not None:
+            with self.__timer.stage("paste"):
+                self.image.paste(shadow, region[:2], shadow)
+
     def __place_shadows(self):
         """
         Function places shadows of all planes on the airbase image.
@@ -199,6 +437,9 @@ class AirbaseImage:
         :param plane_image: PlaneImage object.
         :return: string with label in YOLOv8 format.
         """
+        if plane_image.angle is not None:
+            return self.__place_warped_plane(spawn_point, plane_image)
+
         x, y = spawn_point
         label = self.__generate_plane_label(x, y, plane_image)
 
@@ -206,11 +447,29 @@ class AirbaseImage:
         plane_image_pixel_height = plane_image.pixel_height
         x -= plane_image_pixel_width // 2
         y -= plane_image_pixel_height // 2
-        plane_image = plane_image.get_plane_image()
-        self.image.paste(plane_image, (x, y), plane_image)
+        with self.__timer.stage("plane"):
+            plane_image = plane_image.get_plane_image()
+        with self.__timer.stage("paste"):
+            self.image.paste(plane_image, (x, y), plane_image)
     
         return label
 
+    def __place_warped_plane(self, spawn_point: tuple[int, int], plane_image: PlaneImage) -> str | None:
+        """
+        Function places plane rotated with affine warp on the airbase image and generates label for it
+        from the box of its warped alpha, so the box is tight around the rotated plane.
+        return: string with label in YOLOv8 format or None if the plane is not visible.
+        """
+        with self.__timer.stage("plane"):
+            plane, region = plane_image.get_warped_plane_image(spawn_point, self.__pixel_size)
+        if plane is None:
+            return None
+
+        with self.__timer.stage("paste"):
+            self.image.paste(plane, region[:2], plane)
+        box = self.__offset_box(alpha_box(np.asarray(plane.getchannel("A"))), region)
+        return self.__generate_box_label(plane_image.class_index, box) if box is not None else None
+
     def __place_planes(self) -> list[str]:
         """
         Function places all planes on the airbase image and generate labels for them.
@@ -219,51 +478,169 @@ class AirbaseImage:
         labels = []
         for spawn_point, plane_image in zip(self.__spawn_points, self.__planes):
             label = self.__place_plane(spawn_point, plane_image)
-            labels.append(label)
+            if label is not None:
+                labels.append(label)
         
         return labels
     
+    def __composite_arrays(self) -> tuple[list[str], np.ndarray]:
+        """
+        Function places shadows and then planes of all planes on the airbase image
+        with NumPy operations on one array of the airbase image and generates labels for them.
+        return: tuple with list of strings with labels in YOLOv8 format and uint8 array of the image.
+        """
+        with self.__timer.stage("convert"):
+            canvas = image_to_array(self.image)
+
+        x_offset, y_offset = self.__shadow_parameters["shadow_offset"]
+        for (x, y), plane_image in zip(self.__spawn_points, self.__planes):
+            if plane_image.angle is not None:
+                with self.__timer.stage("shadow"):
+                    shadow, region = plane_image.get_warped_shadow_array(self.__shadow_parameters, (x + x_offset, y + y_offset),
+                                                                         self.__pixel_size)
+                if shadow is not None:
+                    with self.__timer.stage("paste"):
+                        alpha_blend(canvas, shadow, *region[:2])
+                continue
+
+            with self.__timer.stage("shadow"):
+                shadow = plane_image.get_shadow_array(self.__shadow_parameters)
+            x -= plane_image.pixel_width // 2
+            y -= plane_image.pixel_height // 2
+            with self.__timer.stage("paste"):
+                alpha_blend(canvas, shadow, x + x_offset, y + y_offset)
+
+        labels = []
+        for (x, y), plane_image in zip(self.__spawn_points, self.__planes):
+            if plane_image.angle is not None:
+                with self.__timer.stage("plane"):
+                    plane, region = plane_image.get_warped_plane_array((x, y), self.__pixel_size)
+                if plane is None:
+                    continue
+                with self.__timer.stage("paste"):
+                    alpha_blend(canvas, plane, *region[:2])
+                box = self.__offset_box(alpha_box(plane[..., 3:]), region)
+                if box is not None:
+                    labels.append(self.__generate_box_label(plane_image.class_index, box))
+                continue
+
+            labels.append(self.__generate_plane_label(x, y, plane_image))
+            with self.__timer.stage("plane"):
+                plane = plane_image.get_plane_array()
+            x -= plane_image.pixel_width // 2
+            y -= plane_image.pixel_height // 2
+            with self.__timer.stage("paste"):
+                alpha_blend(canvas, plane, x, y)
+
+        with self.__timer.stage("convert"):
+            array = to_uint8(canvas)
+        return labels, array
+
     @staticmethod
-    def __add_interference(image):
+    def generate_interference_parameters() -> dict:
         """
-        Function randomly blurs or sharpens an image and with 0.5 probability adds gaussian noise
-        with 0 mean and standart deviation being random value from 0 to 20.
+        Function randomly chooses sharpness factor of the whole image, below one to blur it or above one to sharpen it,
+        and with 0.5 probability standard deviation of gaussian noise from 2 to 20.
+        return: dict with keys image_sharpness and noise_std (None if noise is not added).
         """
         if random.random() < 0.5:
             image_sharpness = 0.1 + 0.7*random.random()
         else:
             image_sharpness = 1.2 + 0.7*random.random()
 
-        image = ImageEnhance.Sharpness(image).enhance(image_sharpness)
-        if random.random() > 0.5:
-            image = add_gaussian_noise(image, std=random.uniform(2, 20))
+        noise_std = random.uniform(2, 20) if random.random() > 0.5 else None
+        return {"image_sharpness": image_sharpness, "noise_std": noise_std}
+
+    def __add_interference(self, image):
+        """
+        Function randomly blurs or sharpens an image and with 0.5 probability adds gaussian noise
+        with 0 mean and standart deviation being random value from 0 to 20.
+        """
+        parameters = self.__scene or self.generate_interference_parameters()
+
+        with self.__timer.stage("sharpness"):
+            image = ImageEnhance.Sharpness(image).enhance(parameters["image_sharpness"])
+        if parameters["noise_std"] is not None:
+            with self.__timer.stage("noise"):
+                image = add_gaussian_noise(image, std=parameters["noise_std"])
         
         return image
+
+    def __add_interference_to_array(self, array: np.ndarray) -> Image:
+        """
+        Function applies the same interference as __add_interference to uint8 array of the image in place
+        with Interference object and converts it to the image.
+        """
+        parameters = self.__scene or self.generate_interference_parameters()
+
+        with self.__timer.stage("sharpness"):
+            self.__interference.sharpen(array, parameters["image_sharpness"])
+        if parameters["noise_std"] is not None:
+            with self.__timer.stage("noise"):
+                self.__interference.add_noise(array, std=parameters["noise_std"])
+
+        with self.__timer.stage("convert"):
+            return array_to_image(array, self.image.mode)
     
     def create_image(self) -> list[str]:
         """
         Function creates an image of the airbase with planes and shadows and sets list of labels for the planes to labels attribute.
-        Method add_interference is applied to the image with 0.5 probability.
+        Planes and shadows are composited with PIL or with NumPy depending on the backend.
+        Then the image is blurred or sharpened and noise is added to it with 0.5 probability.
         """
-        self.__place_shadows()
-        labels = self.__place_planes()
-        self.labels = labels
-
-        self.image = self.__add_interference(self.image)
+        if self.__backend == "numpy":
+            self.labels, array = self.__composite_arrays()
+            self.image = self.__add_interference_to_array(array)
+        else:
+            self.__place_shadows()
+            self.labels = self.__place_planes()
+            self.image = self.__add_interference(self.image)
     
-    def save_image(self, path_to_save: str, image_number: int) -> None:
+    def save_image(self, path_to_save: str, image_number: int, codec: str="png", compress_level: int=6,
+                   image_writer: AsyncImageWriter=None) -> Future | None:
         """
         Function saves image and labels to the specified paths.
-        :param path_to_save_image: path to save the image.
-        :param path_to_save_label: path to save the labels.
+        :param path_to_save: path to the folder with images and labels folders.
+        :param codec: codec of the image, see async_writer.encode_image.
+        :param image_writer: AsyncImageWriter, if given image and labels are written by it in background,
+        its codec is used instead of codec parameter.
+        return: Future of the background write or None if image is already written.
         """
-        path_to_save_image = os.path.join(path_to_save, "images", f"{image_number}.png")
+        if image_writer is not None:
+            codec = image_writer.codec
+        path_to_save_image = os.path.join(path_to_save, "images", f"{image_number}.{codec}")
         path_to_save_label = os.path.join(path_to_save, "labels", f"{image_number}.txt")
 
-        self.image.save(path_to_save_image)
+        if image_writer is not None:
+            with self.__timer.stage("save_image"):
+                future = image_writer.write(self.image, os.path.splitext(path_to_save_image)[0], "\n".join(self.labels), path_to_save_label)
+            # Image is only queued here, message is printed when the background write succeeds
+            future.add_done_callback(lambda future: print(f"Saved image to {path_to_save_image}")
+                                     if future.exception() is None else None)
+            return future
+
+        with self.__timer.stage("save_image"):
+            encoded_image = encode_image(self.image, codec, compress_level)
+            with open(path_to_save_image, "wb") as file:
+                file.write(encoded_image)
         print(f"Saved image to {path_to_save_image}")
-        with open(path_to_save_label, "w", encoding="utf-8") as file:
+        with self.__timer.stage("save_labels"), open(path_to_save_label, "w", encoding="utf-8") as file:
             file.write("\n".join(self.labels))
+        return None
+
+    def encode_image(self, codec: str="png", compress_level: int=6) -> bytes:
+        """
+        Function encodes image to bytes with the codec, see async_writer.encode_image.
+        """
+        with self.__timer.stage("encode"):
+            return encode_image(self.image, codec, compress_level)
+
+    def labels_array(self) -> np.ndarray:
+        """
+        Function converts labels to float32 array.
+        return: np.ndarray of shape (n, 5) with class id, x center, y center, width and height of every plane.
+        """
+        return np.array([list(map(float, label.split())) for label in self.labels], dtype=np.float32).reshape(-1, 5)
 
 
 class ImageCreator:
@@ -272,35 +649,88 @@ class ImageCreator:
     with create_image method and save this image.
     """
     SMALL_PLANES = {"su24", "su27_su35", "su30_su34"}
-
-    def __init__(self, path_to_airbase_images_folder: str, path_to_plane_images_folder: str, path_to_save: str, start_index: int=0):
+    ROTATION_ANGLES = (0, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330)
+
+    def __init__(self, path_to_airbase_images_folder: str, path_to_plane_images_folder: str, path_to_save: str, start_index: int=0,
+                 compositing_backend: str="pil", sprite_cache_size: int=1024,
+                 assets_memory_budget: int=None, rotation_cache_dir: str=None,
+                 output_format: str="folder", shard_size: int=2**30, timing: bool=False,
+                 image_codec: str="png", compress_level: int=6, writer_workers: int=0, noise_bank_size: int=0,
+                 rotation_mode: str="prerotated", placement_max_iou: float=None, placement_retries: int=3,
+                 class_weights: dict[str, float]=None, placement_max_coverage: float=MAX_COVERAGE):
+        """
+        :param rotation_mode: "prerotated" to place plane images rotated by one of ROTATION_ANGLES with expand=True
+        and label them with size of the rotated image, "affine" to rotate not rotated plane images by any angle
+        with affine warp while they are placed and label them with tight box of the warped plane.
+        :param placement_max_iou: float largest allowed intersection over union of boxes of two planes,
+        planes overlapping more are replaced by other planes, None to place planes on spawn points without checks.
+        :param placement_retries: int number of other small planes tried on a spawn point before it is left empty.
+        :param placement_max_coverage: float largest allowed part of the box of a plane covered by another plane,
+        checked together with placement_max_iou, 1 to check only intersection over union.
+        :param class_weights: dict mapping class name to its target share of placed planes, for example
+        plane_sampler.inverse_frequency_weights of the real dataset, None to choose every plane image with equal probability.
+        """
+        if compositing_backend not in COMPOSITING_BACKENDS:
+            raise ValueError(f"Incorrect compositing backend, has to be one of {COMPOSITING_BACKENDS}")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Incorrect output format, has to be one of {OUTPUT_FORMATS}")
+        if image_codec not in IMAGE_CODECS:
+            raise ValueError(f"Incorrect image codec, has to be one of {IMAGE_CODECS}")
+        if rotation_mode not in ROTATION_MODES:
+            raise ValueError(f"Incorrect rotation mode, has to be one of {ROTATION_MODES}")
+
+        self.__rotation_mode: str = rotation_mode
+        self.__placement_max_iou: float = placement_max_iou
+        self.__placement_retries: int = placement_retries
+        self.__placement_max_coverage: float = placement_max_coverage
+        self.__class_weights: dict[str, float] = class_weights
+        self.__class_histogram: dict[str, int] = {}
+        self.__compositing_backend: str = compositing_backend
+        self.__sprite_cache: SpriteCache = SpriteCache(sprite_cache_size) if compositing_backend == "numpy" else None
+        self.__interference: Interference = Interference(noise_bank_size=noise_bank_size) if compositing_backend == "numpy" else None
         self.__path_to_airbase_images_folder: str = path_to_airbase_images_folder
         self.__path_to_plane_images_folder: str = path_to_plane_images_folder
         self.__airbase_image: AirbaseImage = None
         self.__path_to_save: str = path_to_save
         self.__image_number: int = start_index
+        self.__output_format: str = output_format
+        self.__shard_size: int = shard_size
+        self.__shard_writer: ShardWriter = None
+        self.__timer: StageTimer = StageTimer(enabled=timing)
+        self.__image_codec: str = image_codec
+        self.__compress_level: int = compress_level
+        self.__writer_workers: int = writer_workers
+        self.__image_writer: AsyncImageWriter = None
+        self.__journal: ProgressJournal = None
+        self.__pending_shards: deque = deque()
+
+        # Without path_to_save images can only be rendered in memory with render_array
+        if output_format == "folder" and path_to_save is not None:
+            path_to_save_images: str = os.path.join(path_to_save, "images")
+            if not os.path.exists(path_to_save_images):
+                os.makedirs(path_to_save_images, exist_ok=True)
+
+            path_to_save_labels: str = os.path.join(path_to_save, "labels")
+            if not os.path.exists(path_to_save_labels):
+                os.makedirs(path_to_save_labels, exist_ok=True)
+
+        self.__asset_store: AssetStore = AssetStore(assets_memory_budget, rotation_cache_dir)
 
-        path_to_save_images: str = os.path.join(path_to_save, "images")
-        if not os.path.exists(path_to_save_images):
-            os.makedirs(path_to_save_images, exist_ok=True)
-
-        path_to_save_labels: str = os.path.join(path_to_save, "labels")
-        if not os.path.exists(path_to_save_labels):
-            os.makedirs(path_to_save_labels, exist_ok=True)
-
-        self.__airbases_images: list = []
         self.__airbases_labels: list = []
         self.__read_airbases_data()
 
-        self.__planes_images: dict = {}
         self.__planes_labels: dict = {}
         self.__read_planes_data()
-        self.__prerotate_planes()
 
         self.__small_planes_keys: list = []
         self.__all_planes_keys: list = []
         self.__setup_plane_selection_lists()
 
+        self.__plane_sampler: ClassBalancedSampler = None
+        if class_weights is not None:
+            self.__plane_sampler = ClassBalancedSampler({"s": self.__small_planes_keys, "b": self.__all_planes_keys},
+                                                        class_weights)
+
     def __reset(self):
         self.__airbase_image: AirbaseImage = None
         self.__image_number += 1
@@ -308,40 +738,369 @@ class ImageCreator:
     def create_image(self):
         """
         Function creates image and saves it to the specified location.
+        With shards output format images are appended to the open shard, close has to be called after the last image
+        to write the index of the shards.
+        """
+        self.render_image(self.__image_number)
+        self.__reset()
+
+    def sample_scene(self, image_number: int, seed: int=None) -> dict:
+        """
+        Function samples all random parameters of the image without rendering it: airbase, spawn points,
+        planes with rotation angles and variation parameters, shadow and interference parameters and seed of noise.
+        Parameters are drawn in the same order as they were drawn during rendering before,
+        so rendering the scene gives the same image as render_image with the same seed.
+        If placement_max_iou is set, overlapping planes are replaced or removed, see __place_planes.
+        If seed is given, random generator is seeded from the seed and the image number.
+        return: dict with parameters of the scene that can be saved to JSON.
+        """
+        if seed is not None:
+            random.seed(f"{seed}-{image_number}")
+        numpy_seed = random.getrandbits(32)
+
+        airbase_id = random.randint(0, self.__asset_store.number_of_airbases-1)
+        _, airbase_spawn_points = self.__airbases_labels[airbase_id]
+        point_ids = random.sample(range(len(airbase_spawn_points)), random.randint(1, len(airbase_spawn_points)))
+        spawn_points = [airbase_spawn_points[point_id] for point_id in point_ids]
+        if self.__placement_max_iou is None:
+            planes = [self.__choose_plane(plane_type) for _, _, plane_type in spawn_points]
+            spawn_points = AirbaseImage.modify_spawn_points(spawn_points)
+        else:
+            point_ids, spawn_points, planes = self.__place_planes(airbase_id, point_ids, spawn_points)
+
+        shadow_parameters = AirbaseImage.generate_shadow_parameters()
+        shadow_parameters["shadow_offset"] = list(shadow_parameters["shadow_offset"])
+        for plane in planes:
+            plane["parameters"] = PlaneImage.generate_image_parameters()
+
+        return {
+            "image_number": image_number,
+            "numpy_seed": numpy_seed,
+            "airbase_id": airbase_id,
+            "point_ids": point_ids,
+            "spawn_points": [list(spawn_point) for spawn_point in spawn_points],
+            "planes": planes,
+            "shadow_parameters": shadow_parameters,
+            **AirbaseImage.generate_interference_parameters()
+        }
+
+    def write_manifest(self, path_to_manifest: str, number_of_images: int, seed: int=None) -> list[dict]:
+        """
+        Function samples scenes of images numbered from the start index and writes them to JSON manifest,
+        images can be rendered from it later with render_manifest, fully or partially.
+        :param seed: int base seed of the dataset, random seed is chosen if None.
+        return: list of sampled scenes.
         """
-        airbase_image_name = self.__choose_airbase_image()
-        airbase_image, (airbase_width, plane_spawn_points) = airbase_image_name
+        if seed is None:
+            seed = random.getrandbits(32)
 
-        plane_spawn_points = self.__choose_points(plane_spawn_points)
-        plane_images = self.__choose_plane_images(plane_spawn_points)
+        image_numbers = range(self.__image_number, self.__image_number + number_of_images)
+        scenes = [self.sample_scene(image_number, seed) for image_number in image_numbers]
+        with open(path_to_manifest, "w", encoding="utf-8") as file:
+            json.dump({"version": MANIFEST_VERSION, "seed": seed, "scenes": scenes}, file)
 
-        self.__airbase_image = AirbaseImage(airbase_image, airbase_width, plane_spawn_points, plane_images)
-        self.__airbase_image.create_image()
-        self.__airbase_image.save_image(self.__path_to_save, self.__image_number)
+        print(f"Sampled {number_of_images} scenes to {path_to_manifest}")
+        return scenes
 
-        self.__reset()
+    def render_manifest(self, path_to_manifest: str, workers: int=1, image_numbers: Iterable[int]=None,
+                        shard: tuple[int, int]=None) -> float:
+        """
+        Function renders images from scenes of the manifest written by write_manifest.
+        Images don't depend on each other, so rendering can be split between machines, resumed or repeated for a subset.
+        :param image_numbers: numbers of images to render, all images of the manifest if None.
+        :param shard: tuple with shard index and number of shards, only every number of shards-th scene
+        starting from shard index is rendered.
+        return: float number of rendered images per second.
+        """
+        scenes = read_manifest(path_to_manifest)["scenes"]
+        if image_numbers is not None:
+            image_numbers = set(image_numbers)
+            scenes = [scene for scene in scenes if scene["image_number"] in image_numbers]
+        if shard is not None:
+            shard_id, number_of_shards = shard
+            scenes = scenes[shard_id::number_of_shards]
+
+        return self.__render_images([scene["image_number"] for scene in scenes], workers, scenes=scenes)
+
+    def render_image(self, image_number: int, seed: int=None, scene: dict=None):
+        """
+        Function creates image with the given number and saves it to the specified location,
+        as separate files or appended to shards depending on the output format.
+        If seed is given, random generators are seeded from the seed and the image number,
+        so the image does not depend on which images were rendered before it.
+        :param image_number: int number of the image used in the names of the saved files.
+        :param seed: int base seed of the dataset or None to use current state of random generators.
+        :param scene: dict with parameters of the image from sample_scene, sampled from seed if None.
+        """
+        self.__make_airbase_image(image_number, seed, scene)
+        if self.__output_format == "shards" and self.__image_writer is not None:
+            self.__pending_shards.append((image_number, self.__image_writer.encode(self.__airbase_image.image),
+                                          self.__airbase_image.labels_array()))
+            self.__append_pending_shards(wait=False)
+        elif self.__output_format == "shards":
+            self.__append_to_shards(image_number, self.__airbase_image.encode_image(self.__image_codec, self.__compress_level),
+                                    self.__airbase_image.labels_array())
+        else:
+            future = self.__airbase_image.save_image(self.__path_to_save, image_number, self.__image_codec,
+                                                     self.__compress_level, self.__image_writer)
+            if self.__journal is not None:
+                self.__journal.record(image_number, future)
+        self.__airbase_image = None
+
+    def render_encoded_image(self, image_number: int, seed: int=None, scene: dict=None) -> tuple[bytes, np.ndarray]:
+        """
+        Function creates image with the given number and returns it encoded instead of saving it.
+        return: tuple with bytes of the image encoded with the image codec and float32 array of its labels.
+        """
+        self.__make_airbase_image(image_number, seed, scene)
+        encoded_image = self.__airbase_image.encode_image(self.__image_codec, self.__compress_level)
+        labels = self.__airbase_image.labels_array()
+        self.__airbase_image = None
+        return encoded_image, labels
+
+    def render_array(self, image_number: int, seed: int=None, scene: dict=None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Function creates image with the given number and returns it as array instead of saving it.
+        return: tuple with uint8 array of shape (height, width, 3) with RGB image and float32 array of its labels.
+        """
+        self.__make_airbase_image(image_number, seed, scene)
+        array = np.asarray(self.__airbase_image.image.convert("RGB"))
+        labels = self.__airbase_image.labels_array()
+        self.__airbase_image = None
+        return array, labels
+
+    def close(self):
+        """
+        Function waits for images written in background and writes index of the shards if output format is shards,
+        it is called at the end of generate_dataset and has to be called after images created with create_image.
+        """
+        if self.__image_writer is not None:
+            try:
+                self.__append_pending_shards(wait=True)
+            finally:
+                self.__image_writer.close()
+                self.__image_writer = None
+
+        if self.__shard_writer is not None:
+            self.__shard_writer.close()
+            self.__shard_writer = None
+
+    def __append_pending_shards(self, wait: bool):
+        """
+        Function appends images encoded in background to shards in order of their numbers.
+        :param wait: bool, if True waits for all images, otherwise appends only images encoded before the first unfinished one.
+        """
+        while self.__pending_shards and (wait or self.__pending_shards[0][1].done()):
+            image_number, future, labels = self.__pending_shards.popleft()
+            self.__append_to_shards(image_number, future.result(), labels)
+
+    def __append_to_shards(self, image_number: int, encoded_image: bytes, labels: np.ndarray):
+        if self.__shard_writer is None:
+            self.__shard_writer = ShardWriter(self.__path_to_save, self.__shard_size, image_format=self.__image_codec)
+        with self.__timer.stage("append_shards"):
+            self.__shard_writer.append(image_number, encoded_image, labels)
 
-    def generate_dataset(self, number_of_images: int):
+    def __make_airbase_image(self, image_number: int, seed: int=None, scene: dict=None):
+        """
+        Function creates image of the airbase with planes from the scene and sets it to the __airbase_image attribute.
+        Generator of noise is seeded from the scene, so noise is the same for the same scene.
+        """
+        if scene is None:
+            with self.__timer.stage("sample_scene"):
+                scene = self.sample_scene(image_number, seed)
+
+        for plane in scene["planes"]:
+            class_name = get_class_name(plane["key"])
+            self.__class_histogram[class_name] = self.__class_histogram.get(class_name, 0) + 1
+
+        np.random.seed(scene["numpy_seed"])
+        if self.__interference is not None:
+            self.__interference.seed(np.random.randint(2**32, dtype=np.uint64))
+
+        with self.__timer.stage("choose_assets"):
+            airbase_image = self.__asset_store.get_airbase(scene["airbase_id"])
+            airbase_width, _ = self.__airbases_labels[scene["airbase_id"]]
+            plane_images = [self.__make_plane_image(plane["key"], plane["angle"], plane["parameters"])
+                            for plane in scene["planes"]]
+
+        with self.__timer.stage("setup"):
+            self.__airbase_image = AirbaseImage(airbase_image, airbase_width, None, plane_images,
+                                                backend=self.__compositing_backend, timer=self.__timer,
+                                                interference=self.__interference, scene=scene)
+        self.__airbase_image.create_image()
+
+    def generate_dataset(self, number_of_images: int, workers: int=1, seed: int=None, resume: bool=False) -> float:
         """
         Function generates specified number of artifitial images of planes on the airbase
         and saves them to the specified location.
+        With more than one worker images are rendered in a process pool, workers get a copy
+        of already loaded airbase and plane images instead of reading them again.
+        Every image is seeded from seed and its number, so the dataset is the same for any number of workers.
+        With one worker and writer_workers set, images are encoded and written by background threads
+        while next images are rendered, with more workers every worker saves its images itself.
         :param number_of_images: int value of number of images to generate.
+        :param workers: int number of processes used to render images.
+        With folder output format numbers of written images are recorded in the progress journal in the output folder,
+        with shards output format in the journal of the index of shards, seed is recorded in the journal or meta data of shards.
+        :param seed: int base seed of the dataset, if None and workers > 1 random seed is chosen.
+        :param resume: bool, if True images that are already complete are skipped and only missing ones are rendered,
+        if seed is None recorded seed is used, so missing images are the same as in uninterrupted run.
+        return: float number of generated images per second.
         """
-        for _ in range(number_of_images):
-            self.create_image()
+        image_numbers = range(self.__image_number, self.__image_number + number_of_images)
+        completed = set()
+        if resume:
+            seed, completed = self.__find_completed_images(image_numbers, seed)
+            print(f"Resuming generation: {len(completed)} of {number_of_images} images are complete")
+
+        if workers > 1 and seed is None:
+            seed = random.getrandbits(32)
+
+        missing_image_numbers = [image_number for image_number in image_numbers if image_number not in completed]
+        if self.__output_format == "shards":
+            # Writer is opened before rendering, so seed is recorded and images of an interrupted writer are indexed
+            self.close()
+            self.__shard_writer = ShardWriter(self.__path_to_save, self.__shard_size, self.__image_codec, seed)
+            images_per_second = self.__render_images(missing_image_numbers, workers, seed=seed)
+        else:
+            path_to_journal = os.path.join(self.__path_to_save, JOURNAL_FILE_NAME)
+            with ProgressJournal(path_to_journal, seed, self.__image_codec, completed) as journal:
+                images_per_second = self.__render_images(missing_image_numbers, workers, seed=seed, journal=journal)
+
+        self.__image_number += number_of_images
+        return images_per_second
 
-    def __prerotate_planes(self):
+    def __find_completed_images(self, image_numbers: Iterable[int], seed: int=None) -> tuple[int, set[int]]:
+        """
+        Function finds images that are already complete. For folder output format images recorded in the progress journal
+        only have to exist, other images are checked to be decodable and to have valid labels.
+        For shards images recorded in the index of shards or in its journal are complete.
+        return: tuple with seed of the dataset (recorded seed if seed is None) and set of numbers of complete images.
         """
-        Function creates rotated versions of each plane image in the __planes_images dictionary to save time during image generation.
-        It rotates each plane image by 0, 45, 90, 135, 180, 225, 270, and 315 degrees.
-        The rotated images are stored in a list for each plane name in the __planes_images dictionary.
+        if self.__output_format == "shards":
+            meta = read_meta(self.__path_to_save)
+            if meta is not None:
+                seed = self.__check_resumed_dataset(meta["image_format"], meta.get("seed"), seed)
+            return seed, set(read_image_numbers(self.__path_to_save).tolist()) & set(image_numbers)
+
+        header, journaled = read_journal(os.path.join(self.__path_to_save, JOURNAL_FILE_NAME))
+        if header is not None:
+            seed = self.__check_resumed_dataset(header["image_codec"], header["seed"], seed)
+
+        completed = set()
+        for image_number in image_numbers:
+            path_to_image = os.path.join(self.__path_to_save, "images", f"{image_number}.{self.__image_codec}")
+            path_to_label = os.path.join(self.__path_to_save, "labels", f"{image_number}.txt")
+            if image_number in journaled:
+                is_complete = os.path.isfile(path_to_image) and os.path.isfile(path_to_label)
+            else:
+                is_complete = is_image_complete(path_to_image, path_to_label)
+            if is_complete:
+                completed.add(image_number)
+        return seed, completed
+
+    def __check_resumed_dataset(self, image_codec: str, recorded_seed: int | None, seed: int | None) -> int | None:
         """
-        ANGLES = [0, 30, 60, 90, 120, 150, 180, 210, 240, 270, 300, 330]
-        for plane_name, plane_image in self.__planes_images.items():
-            self.__planes_images[plane_name] = []
-            for angle in ANGLES:
-                rotated_image = plane_image.rotate(angle, expand=True)
-                self.__planes_images[plane_name].append(rotated_image)
+        Function checks that codec and seed are the same as recorded for the resumed dataset.
+        return: seed of the dataset, recorded seed if seed is None.
+        """
+        if image_codec != self.__image_codec:
+            raise ValueError(f"image_codec has to be the same as codec of the resumed dataset ({image_codec})")
+        if seed is not None and recorded_seed is not None and recorded_seed != seed:
+            raise ValueError(f"seed has to be the same as seed of the resumed dataset ({recorded_seed})")
+        return recorded_seed if seed is None else seed
+
+    def __render_images(self, image_numbers: list[int], workers: int, seed: int=None, scenes: list[dict]=None,
+                        journal: ProgressJournal=None) -> float:
+        """
+        Function renders images with given numbers sequentially or in a process pool,
+        from scenes if they are given or from scenes sampled with the seed otherwise.
+        Written images are recorded in the journal if it is given.
+        return: float number of rendered images per second.
+        """
+        if workers < 1:
+            raise ValueError("workers parameter has to be positive integer")
+
+        number_of_images = len(image_numbers)
+        self.__timer.clear()
+        self.__class_histogram.clear()
+        # Statistics are reset before workers are started, so they count only this run and are not copied to every worker
+        if self.__sprite_cache is not None:
+            self.__sprite_cache.reset_stats()
+        time_start = perf_counter()
+        sprite_cache_stats, timing_stats, class_histograms = {}, {}, {}
+        if workers == 1:
+            if self.__writer_workers > 0:
+                self.__image_writer = AsyncImageWriter(self.__image_codec, self.__compress_level,
+                                                       workers=self.__writer_workers, max_queue_size=2 * self.__writer_workers)
+            self.__journal = journal
+            for image_number, scene in zip(image_numbers, scenes if scenes is not None else repeat(None)):
+                self.render_image(image_number, seed, scene)
+            sprite_cache_stats[os.getpid()] = self.sprite_cache_stats
+        else:
+            chunksize = max(1, number_of_images // (workers * 8))
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=_get_pool_context(),
+                                     initializer=_init_worker,
+                                     initargs=(self,)) as executor:
+                results = executor.map(_render_image_in_worker, image_numbers, repeat(seed),
+                                       repeat(self.__output_format == "shards"),
+                                       scenes if scenes is not None else repeat(None), chunksize=chunksize)
+                for image_number, (worker_pid, worker_cache_stats, worker_timing_stats,
+                                   worker_class_histogram, encoded) in zip(image_numbers, results):
+                    sprite_cache_stats[worker_pid] = worker_cache_stats
+                    timing_stats[worker_pid] = worker_timing_stats
+                    class_histograms[worker_pid] = worker_class_histogram
+                    if encoded is not None:
+                        self.__append_to_shards(image_number, *encoded)
+                    elif journal is not None:
+                        journal.record(image_number)
+        self.close()
+        self.__journal = None
+        elapsed_time = perf_counter() - time_start
+
+        images_per_second = number_of_images / elapsed_time if elapsed_time > 0 else float("inf")
+        print(f"Generated {number_of_images} images with {workers} worker(s) in {elapsed_time:.2f} seconds "
+              f"({images_per_second:.2f} images/sec).")
+        if self.__sprite_cache is not None:
+            stats = SpriteCache.merge_stats(list(sprite_cache_stats.values()))
+            print(f"Sprite cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['evictions']} evictions, hit rate {stats['hit_rate']:.1%}.")
+        if self.__timer.enabled:
+            for worker_timing_stats in timing_stats.values():
+                self.__timer.update(worker_timing_stats)
+            print(f"Time of generation stages (summed over workers):\n"
+                  f"{StageTimer.format_stats(self.__timer.stats, number_of_images)}")
+        for worker_class_histogram in class_histograms.values():
+            for class_name, count in worker_class_histogram.items():
+                self.__class_histogram[class_name] = self.__class_histogram.get(class_name, 0) + count
+        if self.__class_weights is not None:
+            print(f"Placed planes per class:\n{format_class_histogram(self.__class_histogram, self.__class_weights)}")
+        return images_per_second
+
+    @property
+    def timing_stats(self) -> dict | None:
+        """
+        Property returns time of generation stages, after generate_dataset it is summed over all workers.
+        Returns None if timing is disabled.
+        """
+        if not self.__timer.enabled:
+            return None
+        return self.__timer.stats
+
+    @property
+    def class_histogram(self) -> dict[str, int]:
+        """
+        Property returns numbers of placed planes of every class, after generate_dataset it is summed over all workers.
+        """
+        return dict(self.__class_histogram)
+
+    @property
+    def sprite_cache_stats(self) -> dict | None:
+        """Property returns statistics of the sprite cache or None if the cache is not used."""
+        if self.__sprite_cache is None:
+            return None
+        return self.__sprite_cache.stats
 
     def __setup_plane_selection_lists(self):
         """
@@ -375,21 +1134,24 @@ class ImageCreator:
         return width, spawn_points
     
     def __read_airbases_data(self):
+        """
+        Function reads labels of airbase images and registers images in the asset store, images are read on first use.
+        """
         path_to_airbase_images = os.path.join(self.__path_to_airbase_images_folder, "images")
 
         sorted_airbase_images = sorted(os.listdir(path_to_airbase_images), key= lambda x: int(os.path.splitext(x)[0]))
         for image_file in sorted_airbase_images:
             airbase_image_name = image_file
             path_to_image = os.path.join(path_to_airbase_images, airbase_image_name)
-            airbase_image = Image.open(path_to_image)
             width, spawn_points = self.__read_airbase_label(airbase_image_name)
 
-            self.__airbases_images.append(airbase_image)
+            self.__asset_store.add_airbase(path_to_image)
             self.__airbases_labels.append((width, spawn_points))
 
     def __read_planes_data(self):
         """
-        Function reads plane images and labels from the file and adds them to the __palne_images __planes_labels dictionary.
+        Function reads plane labels from the file and adds them to the __planes_labels dictionary.
+        Plane images are registered in the asset store, they are read and rotated on first use.
         """
         for folder in os.listdir(self.__path_to_plane_images_folder):
             if not os.path.isdir(os.path.join(self.__path_to_plane_images_folder, folder)):
@@ -400,8 +1162,7 @@ class ImageCreator:
 
             for image_file in os.listdir(path_to_images):
                 key = os.path.splitext(image_file)[0]
-                value = Image.open(os.path.join(path_to_images, image_file))
-                self.__planes_images[key] = value
+                self.__asset_store.add_plane(key, os.path.join(path_to_images, image_file))
 
             for label_file in os.listdir(path_to_labels):
                 key = os.path.splitext(label_file)[0]
@@ -410,53 +1171,144 @@ class ImageCreator:
 
                 self.__planes_labels[key] = value
 
-    def __choose_airbase_image(self) -> str:
+    def __choose_plane(self, plane_type: str) -> dict:
         """
-        Function chooses image of an airbase and returns its name .
+        Function chooses plane image according to a type of the point (s-small, b-small or big) and its rotation angle.
+        If class weights are given plane image is drawn by the class balanced sampler.
+        return: dict with key of the plane image and angle.
         """
-        airbase_image_id = random.randint(0, len(self.__airbases_images)-1)
-        airbase_image = self.__airbases_images[airbase_image_id]
-        airbase_label = self.__airbases_labels[airbase_image_id]
-        return airbase_image, airbase_label
+        if self.__plane_sampler is not None:
+            plane_file_name = self.__plane_sampler.choose(plane_type)
+        else:
+            match plane_type:
+                case "s":
+                    plane_file_name = random.choice(self.__small_planes_keys)
+                case "b":
+                    plane_file_name = random.choice(self.__all_planes_keys)
+                case _:
+                    raise ValueError("Incorrect plane type")
+
+        if self.__rotation_mode == "affine":
+            angle = random.uniform(0, 360)
+        else:
+            angle = random.choice(self.ROTATION_ANGLES)
+        return {"key": plane_file_name, "angle": angle}
 
-    def __choose_points(self, points: tuple) -> list:
+    def __place_planes(self, airbase_id: int, point_ids: list[int], spawn_points: list[tuple]) -> tuple[list, list, list]:
         """
-        Function chooses random number of points from given list and returns them. 
+        Function chooses planes for varied spawn points and keeps only planes which boxes don't overlap boxes
+        of already placed planes more than placement_max_iou. Boxes are checked with FootprintGrid, so a check takes
+        constant time on airbases with any number of points. If the plane doesn't fit, another small plane
+        with another angle is tried up to placement_retries times, then the point is left empty.
+        return: tuple with ids of used points, list of their varied coordinates and list of dicts with planes.
         """
-        n = random.randint(1, len(points))
-        chosen_points = random.sample(points, n)
-        return chosen_points
-
-    def __choose_plane_image(self, plane_type: str) -> PlaneImage:
+        airbase_meter_width, _ = self.__airbases_labels[airbase_id]
+        airbase_pixel_width, _ = self.__asset_store.get_airbase_size(airbase_id)
+        pixels_per_meter = airbase_pixel_width / airbase_meter_width
+        grid = FootprintGrid(max(self.__planes_labels.values()) * pixels_per_meter, self.__placement_max_iou,
+                             self.__placement_max_coverage)
+
+        placed_point_ids, placed_spawn_points, planes = [], [], []
+        for point_id, spawn_point in zip(point_ids, spawn_points):
+            _, _, plane_type = spawn_point
+            [(x, y)] = AirbaseImage.modify_spawn_points([spawn_point])
+            for attempt in range(self.__placement_retries + 1):
+                plane = self.__choose_plane(plane_type if attempt == 0 else "s")
+                box = self.__get_plane_footprint(plane, (x, y), pixels_per_meter)
+                if grid.fits(box):
+                    grid.insert(box)
+                    placed_point_ids.append(point_id)
+                    placed_spawn_points.append((x, y))
+                    planes.append(plane)
+                    break
+
+        return placed_point_ids, placed_spawn_points, planes
+
+    def __get_plane_footprint(self, plane: dict, center: tuple[int, int], pixels_per_meter: float) -> tuple:
         """
-        Function chooses plane image from given filder according to a type (s-small, b-small or big)
-        return: PlaneImage object
+        Function computes box of the plane placed on the airbase image from sizes of the image files, without reading images.
+        return: tuple with left, top, right and bottom coordinates.
         """
-        match plane_type:
-            case "s":
-                plane_file_name = random.choice(self.__small_planes_keys)
-                plane_image = random.choice(self.__planes_images[plane_file_name])
-                plane_width_label = self.__planes_labels[plane_file_name]
-                plane_id = CLASSES_NAMES_MAPPING[plane_file_name[:plane_file_name.rfind("_")]]
-            case "b":
-                plane_file_name = random.choice(self.__all_planes_keys)
-                plane_image = random.choice(self.__planes_images[plane_file_name])
-                plane_width_label = self.__planes_labels[plane_file_name]
-                plane_id = CLASSES_NAMES_MAPPING[plane_file_name[:plane_file_name.rfind("_")]]
-            case _:
-                raise ValueError("Incorrect plane type")
+        width, height = self.__asset_store.get_plane_size(plane["key"])
+        if self.__rotation_mode == "prerotated":
+            width, height = rotated_size((width, height), plane["angle"])
 
-        return PlaneImage(plane_image, plane_width_label, plane_id)
-    
-    def __choose_plane_images(self, points: list):
+        pixel_width = round(self.__planes_labels[plane["key"]] * pixels_per_meter)
+        pixel_height = round(pixel_width * height / width)
+        if self.__rotation_mode == "affine":
+            pixel_width, pixel_height = rotated_size((pixel_width, pixel_height), plane["angle"])
+
+        x, y = center
+        return x - pixel_width / 2, y - pixel_height / 2, x + pixel_width / 2, y + pixel_height / 2
+
+    def __make_plane_image(self, plane_file_name: str, angle: float, image_parameters: dict=None) -> PlaneImage:
         """
-        Function chooses planes to place on each point and sets list of them to the __planes attribute.
+        Function makes PlaneImage object of the plane image rotated by the angle.
+        With affine rotation mode the image is not rotated and the angle is applied when the plane is placed,
+        so one resized sprite is shared by all angles.
         """
-        planes = []
-        for _, _, plane_type in points:
-            planes.append(self.__choose_plane_image(plane_type))
+        plane_width_label = self.__planes_labels[plane_file_name]
+        plane_id = CLASSES_NAMES_MAPPING[plane_file_name[:plane_file_name.rfind("_")]]
+        if self.__rotation_mode == "affine":
+            plane_image = self.__asset_store.get_plane(plane_file_name, 0)
+            return PlaneImage(plane_image, plane_width_label, plane_id, (plane_file_name, 0), self.__sprite_cache,
+                              image_parameters, angle=angle)
+
+        plane_image = self.__asset_store.get_plane(plane_file_name, angle)
+        sprite_key = (plane_file_name, angle)
+
+        return PlaneImage(plane_image, plane_width_label, plane_id, sprite_key, self.__sprite_cache, image_parameters)
+
+
+def read_manifest(path_to_manifest: str) -> dict:
+    """
+    Function reads manifest written by ImageCreator.write_manifest.
+    return: dict with seed of the dataset and list of scenes.
+    """
+    with open(path_to_manifest, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('version')}, expected {MANIFEST_VERSION}")
+    return manifest
+
 
-        return planes
+_WORKER_IMAGE_CREATOR: ImageCreator = None
+
+
+def _get_pool_context():
+    """
+    Function returns multiprocessing context for the generation pool.
+    Fork is preferred because workers then share already loaded images with the main process.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(image_creator: ImageCreator):
+    """
+    Function stores image creator in the worker process.
+    """
+    global _WORKER_IMAGE_CREATOR
+    _WORKER_IMAGE_CREATOR = image_creator
+
+
+def _render_image_in_worker(image_number: int, seed: int, return_encoded: bool,
+                            scene: dict=None) -> tuple[int, dict | None, dict, dict, tuple | None]:
+    """
+    Function renders one image in the worker process, from the scene if it is given.
+    If return_encoded is True image is returned to the main process, which appends it to shards, instead of saving it.
+    return: tuple with pid of the worker, statistics of its sprite cache, time of its generation stages,
+    numbers of its placed planes of every class and encoded image with labels or None.
+    """
+    encoded = None
+    if return_encoded:
+        encoded = _WORKER_IMAGE_CREATOR.render_encoded_image(image_number, seed, scene)
+    else:
+        _WORKER_IMAGE_CREATOR.render_image(image_number, seed, scene)
+    return (os.getpid(), _WORKER_IMAGE_CREATOR.sprite_cache_stats, _WORKER_IMAGE_CREATOR.timing_stats,
+            _WORKER_IMAGE_CREATOR.class_histogram, encoded)
 
 
 if __name__ == "__main__":
@@ -467,6 +1319,6 @@ if __name__ == "__main__":
                                  path_to_airbase_images_folder="data/artifitial-data/airbase-images",
                                  path_to_save="data/artifitial-data/artifitial-images-dataset-v2",
                                  start_index=0)
-    image_creator.generate_dataset(number_of_images=6000)
+    image_creator.generate_dataset(number_of_images=6000, workers=os.cpu_count(), seed=0)
     time_end = time()
     print(f"Generated images in {time_end - time_start:.2f} seconds.")
@@ -0,0 +1,147 @@
+import os
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+
+class AssetStore:
+    """
+    Class used to load airbase and plane images only when they are used for the first time.
+    Loaded images are kept in least recently used order, if memory budget is set
+    the least recently used images are removed when their total size exceeds it.
+    Rotated plane images can be saved to the cache folder as .npy files,
+    so later runs and pool workers read them with memory mapping instead of rotating planes again.
+    """
+    def __init__(self, memory_budget: int=None, rotation_cache_dir: str=None):
+        """
+        :param memory_budget: int maximum size of loaded images in bytes or None to keep all loaded images.
+        :param rotation_cache_dir: path to the folder for rotated plane images or None to rotate them in memory only.
+        """
+        if memory_budget is not None and memory_budget < 0:
+            raise ValueError("memory_budget parameter has to be non-negative integer")
+
+        self.__memory_budget: int = memory_budget
+        self.__rotation_cache_dir: str = rotation_cache_dir
+        if rotation_cache_dir is not None:
+            os.makedirs(rotation_cache_dir, exist_ok=True)
+
+        self.__airbase_paths: list[str] = []
+        self.__plane_paths: dict[str, str] = {}
+
+        self.__images: OrderedDict = OrderedDict()
+        self.__memory_usage: int = 0
+        self.__image_sizes: dict[str, tuple[int, int]] = {}
+
+    @property
+    def memory_usage(self) -> int:
+        """Property returns size of currently loaded images in bytes."""
+        return self.__memory_usage
+
+    @property
+    def number_of_airbases(self) -> int:
+        """Property returns number of registered airbase images."""
+        return len(self.__airbase_paths)
+
+    def add_airbase(self, path: str) -> int:
+        """
+        Function registers airbase image without reading it.
+        return: int id of the airbase image.
+        """
+        self.__airbase_paths.append(path)
+        return len(self.__airbase_paths) - 1
+
+    def add_plane(self, key: str, path: str) -> None:
+        """
+        Function registers plane image under the given key without reading it.
+        """
+        self.__plane_paths[key] = path
+
+    def get_airbase(self, airbase_id: int) -> Image.Image:
+        """
+        Function returns decoded airbase image, image is read from the file on first use.
+        """
+        return self.__get(("airbase", airbase_id), lambda: self.__read_image(self.__airbase_paths[airbase_id]))
+
+    def get_plane(self, key: str, angle: int) -> Image.Image:
+        """
+        Function returns plane image rotated by the given angle with expand=True.
+        Rotated image is read from the rotation cache folder if it is valid or made from the original plane image.
+        """
+        return self.__get(("plane", key, angle), lambda: self.__load_rotated_plane(key, angle))
+
+    def get_airbase_size(self, airbase_id: int) -> tuple[int, int]:
+        """
+        Function returns width and height of the airbase image, only header of the file is read.
+        """
+        return self.__get_image_size(self.__airbase_paths[airbase_id])
+
+    def get_plane_size(self, key: str) -> tuple[int, int]:
+        """
+        Function returns width and height of not rotated plane image, only header of the file is read.
+        """
+        return self.__get_image_size(self.__plane_paths[key])
+
+    def __get_image_size(self, path: str) -> tuple[int, int]:
+        if path not in self.__image_sizes:
+            with Image.open(path) as image:
+                self.__image_sizes[path] = image.size
+        return self.__image_sizes[path]
+
+    def clear(self) -> None:
+        """Function removes all loaded images from memory."""
+        self.__images.clear()
+        self.__memory_usage = 0
+
+    def __get(self, key: tuple, load_image) -> Image.Image:
+        """
+        Function returns image from memory or loads it and removes least recently used images over the memory budget.
+        """
+        image = self.__images.get(key)
+        if image is not None:
+            self.__images.move_to_end(key)
+            return image
+
+        image = load_image()
+        self.__images[key] = image
+        self.__memory_usage += self.__image_size(image)
+
+        if self.__memory_budget is not None:
+            while self.__memory_usage > self.__memory_budget and len(self.__images) > 1:
+                _, evicted_image = self.__images.popitem(last=False)
+                self.__memory_usage -= self.__image_size(evicted_image)
+
+        return image
+
+    @staticmethod
+    def __image_size(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    @staticmethod
+    def __read_image(path: str) -> Image.Image:
+        image = Image.open(path)
+        image.load()
+        return image
+
+    def __load_rotated_plane(self, key: str, angle: int) -> Image.Image:
+        """
+        Function rotates plane image or reads already rotated image from the rotation cache folder.
+        Cached file is used only if it is newer than the original plane image, image for angle 0 is not cached.
+        """
+        path_to_plane = self.__plane_paths[key]
+        if angle == 0:
+            return self.__read_image(path_to_plane).convert("RGBA")
+        if self.__rotation_cache_dir is None:
+            return self.__read_image(path_to_plane).convert("RGBA").rotate(angle, expand=True)
+
+        path_to_cached = os.path.join(self.__rotation_cache_dir, f"{key}_{angle}.npy")
+        if os.path.exists(path_to_cached) and os.path.getmtime(path_to_cached) >= os.path.getmtime(path_to_plane):
+            return Image.fromarray(np.load(path_to_cached, mmap_mode="r"))
+
+        rotated_image = self.__read_image(path_to_plane).convert("RGBA").rotate(angle, expand=True)
+
+        path_to_temporary = f"{path_to_cached}.{os.getpid()}.tmp"
+        with open(path_to_temporary, "wb") as file:
+            np.save(file, np.asarray(rotated_image))
+        os.replace(path_to_temporary, path_to_cached)
+
+        return rotated_image
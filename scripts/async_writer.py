@@ -0,0 +1,126 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+import numpy as np
+from PIL import Image
+
+
+IMAGE_CODECS = ("png", "webp", "npy")
+
+
+def encode_image(image: Image.Image, codec: str="png", compress_level: int=6) -> bytes:
+    """
+    Function encodes image with the codec.
+    :param codec: "png", "webp" (lossless) or "npy" (raw array without compression).
+    :param compress_level: int zlib level from 0 to 9 for PNG, effort from 0 to 6 for WebP (higher levels are clipped to 6),
+    not used for npy. Lower levels are faster and give larger files.
+    return: bytes of the encoded image.
+    """
+    buffer = io.BytesIO()
+    match codec:
+        case "png":
+            image.save(buffer, format="PNG", compress_level=compress_level)
+        case "webp":
+            image.save(buffer, format="WEBP", lossless=True, method=min(compress_level, 6))
+        case "npy":
+            np.save(buffer, np.asarray(image), allow_pickle=False)
+        case _:
+            raise ValueError(f"Incorrect image codec, has to be one of {IMAGE_CODECS}")
+    return buffer.getvalue()
+
+
+def decode_image(data: bytes, codec: str="png") -> Image.Image:
+    """
+    Function decodes image encoded by encode_image.
+    """
+    if codec == "npy":
+        return Image.fromarray(np.load(io.BytesIO(data), allow_pickle=False))
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+class AsyncImageWriter:
+    """
+    Class used to encode and write images in background threads while the next image is rendered.
+    Pillow encoders and file writes release the GIL, so encoding overlaps with compositing of the next image.
+    Number of images waiting for encoding is bounded by max_queue_size, submitting blocks when the queue is full,
+    so memory used by waiting images is limited. Errors of background writes are raised by flush and close.
+    """
+    def __init__(self, codec: str="png", compress_level: int=6, workers: int=2, max_queue_size: int=8):
+        if codec not in IMAGE_CODECS:
+            raise ValueError(f"Incorrect image codec, has to be one of {IMAGE_CODECS}")
+        if workers < 1 or max_queue_size < 1:
+            raise ValueError("workers and max_queue_size parameters have to be positive integers")
+
+        self.codec: str = codec
+        self.compress_level: int = compress_level
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-writer")
+        self.__slots = threading.BoundedSemaphore(max_queue_size)
+        self.__lock = threading.Lock()
+        self.__futures: set[Future] = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __submit(self, function, *args) -> Future:
+        self.__slots.acquire()
+        try:
+            future = self.__executor.submit(function, *args)
+        except BaseException:
+            self.__slots.release()
+            raise
+
+        with self.__lock:
+            self.__futures.add(future)
+        future.add_done_callback(self.__on_done)
+        return future
+
+    def __on_done(self, future: Future) -> None:
+        self.__slots.release()
+        with self.__lock:
+            if future.exception() is None:
+                self.__futures.discard(future)
+
+    def encode(self, image: Image.Image) -> Future:
+        """
+        Function submits image for encoding.
+        return: Future which result is bytes of the encoded image.
+        """
+        return self.__submit(encode_image, image, self.codec, self.compress_level)
+
+    def write(self, image: Image.Image, path_to_image: str, labels: str=None, path_to_label: str=None) -> Future:
+        """
+        Function submits image and optionally its labels for writing.
+        :param path_to_image: path to the image file without extension, name of the codec is added as extension.
+        """
+        return self.__submit(self.__write, image, path_to_image, labels, path_to_label)
+
+    def __write(self, image: Image.Image, path_to_image: str, labels: str, path_to_label: str) -> None:
+        encoded_image = encode_image(image, self.codec, self.compress_level)
+        with open(f"{path_to_image}.{self.codec}", "wb") as file:
+            file.write(encoded_image)
+
+        if path_to_label is not None:
+            with open(path_to_label, "w", encoding="utf-8") as file:
+                file.write(labels)
+
+    def flush(self) -> None:
+        """
+        Function waits until all submitted images are written and raises the first error of background writes.
+        """
+        with self.__lock:
+            futures = list(self.__futures)
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        """Function waits for submitted images and stops background threads."""
+        try:
+            self.flush()
+        finally:
+            self.__executor.shutdown(wait=True)
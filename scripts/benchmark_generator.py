@@ -0,0 +1,86 @@
+import sys
+import argparse
+import tempfile
+from artifitial_image_generator import ImageCreator, COMPOSITING_BACKENDS, OUTPUT_FORMATS, ROTATION_MODES
+from async_writer import IMAGE_CODECS
+from placement import MAX_COVERAGE
+
+try:
+    import resource
+except ImportError: # Peak memory is not reported on Windows
+    resource = None
+
+
+def get_peak_rss() -> tuple[float, float] | None:
+    """
+    Function returns peak resident set size in MiB of this process and of the largest finished child process (pool workers).
+    return: tuple with two values or None if the platform doesn't report it.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    peak_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20
+    peak_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 2**20
+    return peak_self, peak_children
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate seeded artificial images and report time of generation stages, "
+                                                 "images per second and peak memory.")
+    parser.add_argument("--airbase-images", default="data/artifitial-data/airbase-images", help="folder with airbase images and labels")
+    parser.add_argument("--plane-images", default="data/artifitial-data/plane-images", help="folder with plane images")
+    parser.add_argument("--output", default=None, help="folder to save images to, temporary folder removed after the run if not set")
+    parser.add_argument("--number-of-images", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--backend", choices=COMPOSITING_BACKENDS, default="pil")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="folder")
+    parser.add_argument("--rotation-mode", choices=ROTATION_MODES, default="prerotated")
+    parser.add_argument("--codec", choices=IMAGE_CODECS, default="png")
+    parser.add_argument("--compress-level", type=int, default=6, help="PNG zlib level or WebP effort")
+    parser.add_argument("--noise-bank-size", type=int, default=0, help="number of precomputed noise tiles of the NumPy backend")
+    parser.add_argument("--placement-max-iou", type=float, default=None,
+                        help="largest allowed IoU of boxes of two planes, planes are placed without checks if not set")
+    parser.add_argument("--placement-max-coverage", type=float, default=MAX_COVERAGE,
+                        help="largest allowed part of the box of a plane covered by another plane, used with --placement-max-iou")
+    parser.add_argument("--writer-workers", type=int, default=0, help="threads encoding and writing images in background, 0 to write synchronously")
+    return parser.parse_args()
+
+
+def run_benchmark(args: argparse.Namespace, path_to_save: str) -> None:
+    image_creator = ImageCreator(path_to_airbase_images_folder=args.airbase_images,
+                                 path_to_plane_images_folder=args.plane_images,
+                                 path_to_save=path_to_save,
+                                 compositing_backend=args.backend,
+                                 output_format=args.output_format,
+                                 timing=True,
+                                 image_codec=args.codec,
+                                 compress_level=args.compress_level,
+                                 writer_workers=args.writer_workers,
+                                 noise_bank_size=args.noise_bank_size,
+                                 rotation_mode=args.rotation_mode,
+                                 placement_max_iou=args.placement_max_iou,
+                                 placement_max_coverage=args.placement_max_coverage)
+    images_per_second = image_creator.generate_dataset(args.number_of_images, workers=args.workers, seed=args.seed)
+
+    print(f"\nBackend {args.backend}, {args.rotation_mode} rotation, output format {args.output_format}, codec {args.codec} level {args.compress_level}, "
+          f"{args.workers} worker(s), {args.writer_workers} writer thread(s), seed {args.seed}")
+    print(f"{images_per_second:.2f} images/sec")
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        print(f"Peak RSS: {peak_rss[0]:.1f} MiB main process, {peak_rss[1]:.1f} MiB largest worker")
+
+
+def main():
+    args = parse_args()
+    if args.output is not None:
+        run_benchmark(args, args.output)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="generator-benchmark-") as path_to_save:
+        run_benchmark(args, path_to_save)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import math
+import numpy as np
+from PIL import Image
+
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32) # Same weights as PIL uses for RGB -> L conversion
+MIN_BLUR_RADIUS = 0.3 # Gaussian kernels with smaller sigma barely change the image and are skipped
+ALPHA_THRESHOLD = 128 # Pixels of a sprite with at least this opacity are inside its bounding box
+
+
+def image_to_array(image: Image.Image) -> np.ndarray:
+    """
+    Function converts PIL image to float32 array with values in range from 0 to 255.
+    return: np.ndarray with shape (height, width, channels).
+    """
+    array = np.asarray(image, dtype=np.float32)
+    if array.ndim == 2:
+        array = array[..., None]
+    return array
+
+
+def to_uint8(array: np.ndarray) -> np.ndarray:
+    """
+    Function rounds float array and converts it to uint8 array.
+    """
+    return np.clip(np.rint(array), 0, 255).astype(np.uint8)
+
+
+def array_to_image(array: np.ndarray, mode: str) -> Image.Image:
+    """
+    Function rounds float array to uint8 and converts it to PIL image of the given mode, uint8 arrays are not converted.
+    """
+    if array.dtype != np.uint8:
+        array = to_uint8(array)
+    if array.shape[-1] == 1:
+        array = array[..., 0]
+    return Image.fromarray(array, mode)
+
+
+def grayscale(rgb: np.ndarray) -> np.ndarray:
+    """
+    Function returns luminance of the RGB array with shape (height, width, 1).
+    """
+    return (rgb[..., :3] @ LUMA_WEIGHTS)[..., None]
+
+
+def adjust_color(rgb: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Function changes saturation of the RGB array in place, equivalent of PIL.ImageEnhance.Color.
+    """
+    gray = grayscale(rgb)
+    rgb -= gray
+    rgb *= factor
+    rgb += gray
+    return np.clip(rgb, 0, 255, out=rgb)
+
+
+def adjust_brightness(rgb: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Function changes brightness of the RGB array in place, equivalent of PIL.ImageEnhance.Brightness.
+    """
+    rgb *= factor
+    return np.clip(rgb, 0, 255, out=rgb)
+
+
+def adjust_contrast(rgb: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Function changes contrast of the RGB array in place, equivalent of PIL.ImageEnhance.Contrast.
+    Mean luminance is taken over the whole array like in PIL, including transparent pixels.
+    """
+    mean = np.float32(int(grayscale(rgb).mean() + 0.5))
+    rgb -= mean
+    rgb *= factor
+    rgb += mean
+    return np.clip(rgb, 0, 255, out=rgb)
+
+
+def smooth(array: np.ndarray) -> np.ndarray:
+    """
+    Function applies PIL.ImageFilter.SMOOTH kernel ([[1, 1, 1], [1, 5, 1], [1, 1, 1]] / 13) to the array.
+    The kernel equals 9/13 of 3x3 box filter plus 4/13 of the identity, so it is computed with two separable passes.
+    Border pixels are left unchanged like in PIL.
+    """
+    result = array.copy()
+    if array.shape[0] < 3 or array.shape[1] < 3:
+        return result
+
+    rows = array[:-2] + array[1:-1] + array[2:]
+    box = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+    result[1:-1, 1:-1] = (box + 4 * array[1:-1, 1:-1]) / 13
+    return result
+
+
+def adjust_sharpness(rgb: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Function changes sharpness of the RGB array in place, equivalent of PIL.ImageEnhance.Sharpness.
+    """
+    smoothed = smooth(rgb)
+    rgb -= smoothed
+    rgb *= factor
+    rgb += smoothed
+    return np.clip(rgb, 0, 255, out=rgb)
+
+
+def gaussian_kernel(radius: float) -> np.ndarray:
+    """
+    Function returns normalized 1D gaussian kernel with standard deviation equal to radius.
+    """
+    half_size = max(1, int(np.ceil(3 * radius)))
+    x = np.arange(-half_size, half_size + 1, dtype=np.float32)
+    kernel = np.exp(-x**2 / (2 * radius**2))
+    return kernel / kernel.sum()
+
+
+def gaussian_blur(array: np.ndarray, radius: float) -> np.ndarray:
+    """
+    Function blurs array of shape (height, width, channels) with separable gaussian kernel.
+    Edges are extended like in PIL.ImageFilter.GaussianBlur.
+    """
+    if radius < MIN_BLUR_RADIUS:
+        return array
+
+    kernel = gaussian_kernel(radius)
+    half_size = len(kernel) // 2
+    height, width = array.shape[:2]
+
+    padded = np.pad(array, ((half_size, half_size), (0, 0), (0, 0)), mode="edge")
+    blurred = np.zeros_like(array)
+    for i, weight in enumerate(kernel):
+        blurred += weight * padded[i:i + height]
+
+    padded = np.pad(blurred, ((0, 0), (half_size, half_size), (0, 0)), mode="edge")
+    blurred.fill(0)
+    for i, weight in enumerate(kernel):
+        blurred += weight * padded[:, i:i + width]
+
+    return blurred
+
+
+def alpha_blend(canvas: np.ndarray, sprite: np.ndarray, x: int, y: int) -> None:
+    """
+    Function blends RGBA sprite into the canvas in place with top left corner at (x, y),
+    equivalent of PIL Image.paste with the sprite used as a mask.
+    Parts of the sprite outside of the canvas are cut off.
+    """
+    canvas_height, canvas_width = canvas.shape[:2]
+    sprite_height, sprite_width = sprite.shape[:2]
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite_width, canvas_width), min(y + sprite_height, canvas_height)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    sprite = sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+    alpha = sprite[..., 3:] / 255
+    region = canvas[y0:y1, x0:x1]
+    channels = region.shape[-1]
+
+    region *= 1 - alpha
+    region += alpha * sprite[..., :channels]
+
+
+def affine_region(center: tuple[float, float], size: tuple[int, int], angle: float,
+                  canvas_size: tuple[int, int]) -> tuple[int, int, int, int] | None:
+    """
+    Function returns region of the canvas covered by the sprite of the given size rotated by angle around the center,
+    with one pixel margin for interpolation and cut to the canvas.
+    return: tuple with left, top, right and bottom coordinates or None if the sprite is outside of the canvas.
+    """
+    width, height = size
+    cos, sin = abs(math.cos(math.radians(angle))), abs(math.sin(math.radians(angle)))
+    half_width = (width * cos + height * sin) / 2
+    half_height = (width * sin + height * cos) / 2
+
+    x_center, y_center = center
+    canvas_width, canvas_height = canvas_size
+    x0, y0 = max(math.floor(x_center - half_width) - 1, 0), max(math.floor(y_center - half_height) - 1, 0)
+    x1 = min(math.ceil(x_center + half_width) + 1, canvas_width)
+    y1 = min(math.ceil(y_center + half_height) + 1, canvas_height)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+def affine_coefficients(source_size: tuple[int, int], size: tuple[int, int], angle: float,
+                        center: tuple[float, float]) -> tuple[float, ...]:
+    """
+    Function returns coefficients of the affine transform that scales the source image to the size,
+    rotates it counterclockwise by angle like PIL Image.rotate and moves its center to the center point.
+    Coefficients map point of the output to point of the source like in PIL Image.transform with Image.AFFINE.
+    """
+    source_width, source_height = source_size
+    width, height = size
+    scale_x, scale_y = source_width / width, source_height / height
+    cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    x_center, y_center = center
+
+    a, b = cos * scale_x, -sin * scale_x
+    d, e = sin * scale_y, cos * scale_y
+    c = source_width / 2 - a * x_center - b * y_center
+    f = source_height / 2 - d * x_center - e * y_center
+    return a, b, c, d, e, f
+
+
+def warp_affine(array: np.ndarray, coefficients: tuple[float, ...], size: tuple[int, int]) -> np.ndarray:
+    """
+    Function transforms float32 array of shape (height, width, channels) with bilinear interpolation,
+    equivalent of PIL Image.transform with Image.AFFINE, coefficients and output size are the same.
+    Points outside of the source array are filled with zeros.
+    """
+    a, b, c, d, e, f = coefficients
+    width, height = size
+    source_height, source_width = array.shape[:2]
+
+    # Pixel centers of the output mapped to the source, shifted so source pixel centers are at integer coordinates
+    x = np.arange(width, dtype=np.float32) + 0.5
+    y = np.arange(height, dtype=np.float32)[:, None] + 0.5
+    u = a * x + b * y + (c - 0.5)
+    v = d * x + e * y + (f - 0.5)
+    inside = (u > -1) & (u < source_width) & (v > -1) & (v < source_height)
+
+    u0, v0 = np.floor(u), np.floor(v)
+    fu, fv = (u - u0)[..., None], (v - v0)[..., None]
+    # Indices in the source padded with one row and column of zeros on every side
+    u0 = np.clip(u0.astype(np.int32) + 1, 0, source_width)
+    v0 = np.clip(v0.astype(np.int32) + 1, 0, source_height)
+
+    padded = np.pad(array, ((1, 1), (1, 1), (0, 0)))
+    warped = padded[v0, u0] * ((1 - fu) * (1 - fv))
+    warped += padded[v0, u0 + 1] * (fu * (1 - fv))
+    warped += padded[v0 + 1, u0] * ((1 - fu) * fv)
+    warped += padded[v0 + 1, u0 + 1] * (fu * fv)
+    warped[~inside] = 0
+    return warped
+
+
+def warp_sprite(sprite: np.ndarray, coefficients: tuple[float, ...], size: tuple[int, int]) -> np.ndarray:
+    """
+    Function transforms float32 RGBA sprite like warp_affine, colors are interpolated premultiplied by alpha,
+    so fully transparent pixels don't darken edges of the sprite. Sprite is changed in place.
+    """
+    sprite[..., :3] *= sprite[..., 3:] / 255
+    warped = warp_affine(sprite, coefficients, size)
+    alpha = warped[..., 3:]
+    np.divide(warped[..., :3] * 255, alpha, out=warped[..., :3], where=alpha > 0)
+    return warped
+
+
+def alpha_box(alpha: np.ndarray, threshold: float=ALPHA_THRESHOLD) -> tuple[int, int, int, int] | None:
+    """
+    Function returns bounding box of pixels of the alpha array with opacity not less than threshold.
+    return: tuple with left, top, right and bottom coordinates (right and bottom are exclusive) or None if there are no such pixels.
+    """
+    mask = alpha >= threshold
+    if mask.ndim == 3:
+        mask = mask[..., 0]
+    rows, columns = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0:
+        return None
+    return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
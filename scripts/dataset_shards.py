@@ -0,0 +1,257 @@
+import os
+import json
+import mmap
+import numpy as np
+from PIL import Image
+from async_writer import decode_image
+
+
+INDEX_FILE_NAME = "index.npz"
+INDEX_JOURNAL_FILE_NAME = "index.journal"
+META_FILE_NAME = "meta.json"
+LABEL_COLUMNS = 5 # class id, x center, y center, width, height
+
+
+class ShardWriter:
+    """
+    Class used to write encoded images and their labels to a few large shard files.
+    Encoded images are appended to shard-XXXXX.bin files, a new shard is started when current one exceeds shard_size.
+    Labels of all images are stored in one float32 table, index maps every image to its bytes in a shard and its rows in the table.
+    If the folder already contains shards, new images are appended to them. Image with a number that is already
+    in the index replaces the old entry, bytes of the old image stay unused in its shard.
+    Index is written on close, until then every appended image is recorded in index.journal after its bytes are flushed,
+    so after a crash images from the journal are added to the index by the next writer. New shards never
+    overwrite existing shard files. Image format and seed of the dataset are stored in meta.json.
+    """
+    def __init__(self, path_to_shards: str, shard_size: int=2**30, image_format: str="png", seed: int=None):
+        """
+        :param seed: int base seed of the dataset recorded in meta.json, so generation can be resumed with the same seed.
+        """
+        self.__path_to_shards: str = path_to_shards
+        self.__shard_size: int = shard_size
+        self.__image_format: str = image_format
+        self.__seed: int = seed
+        os.makedirs(path_to_shards, exist_ok=True)
+
+        meta = read_meta(path_to_shards)
+        if meta is not None and meta["image_format"] != image_format:
+            raise ValueError(f"image_format has to be the same as format of existing shards ({meta['image_format']})")
+
+        # Entries are kept in order of appending: image number -> (shard id, offset, length, labels)
+        self.__entries: dict[int, tuple[int, int, int, np.ndarray]] = read_entries(path_to_shards)
+        self.__write_meta()
+
+        existing_shard_ids = [int(name[6:11]) for name in os.listdir(path_to_shards)
+                              if name.startswith("shard-") and name.endswith(".bin")]
+        self.__shard_id: int = max(existing_shard_ids + [entry[0] for entry in self.__entries.values()], default=-1) + 1
+        self.__shard_file = None
+        self.__shard_position: int = 0
+        self.__journal_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, image_number: int, encoded_image: bytes, labels: np.ndarray) -> None:
+        """
+        Function appends encoded image and its labels.
+        :param labels: array of shape (n, 5) with class id and normalized box of every plane.
+        """
+        if self.__shard_file is None or self.__shard_position >= self.__shard_size:
+            self.__start_shard()
+
+        self.__shard_file.write(encoded_image)
+        self.__shard_file.flush()
+        labels = np.asarray(labels, dtype=np.float32).reshape(-1, LABEL_COLUMNS)
+        entry = (self.__shard_id, self.__shard_position, len(encoded_image), labels)
+        self.__entries.pop(image_number, None) # Replaced image is moved to the end of the index
+        self.__entries[image_number] = entry
+        self.__shard_position += len(encoded_image)
+
+        if self.__journal_file is None:
+            self.__journal_file = open(os.path.join(self.__path_to_shards, INDEX_JOURNAL_FILE_NAME), "a", encoding="utf-8")
+        self.__journal_file.write(json.dumps([image_number, *entry[:3], labels.tolist()]) + "\n")
+        self.__journal_file.flush()
+
+    def __start_shard(self):
+        if self.__shard_file is not None:
+            self.__shard_file.close()
+            self.__shard_id += 1
+
+        path_to_shard = os.path.join(self.__path_to_shards, f"shard-{self.__shard_id:05d}.bin")
+        self.__shard_file = open(path_to_shard, "xb")
+        self.__shard_position = 0
+
+    def close(self) -> None:
+        """
+        Function closes current shard and writes index, labels table and meta data, then removes the journal.
+        """
+        if self.__shard_file is not None:
+            self.__shard_file.close()
+            self.__shard_file = None
+            self.__shard_id += 1
+
+        entries = list(self.__entries.values())
+        labels = [entry[3] for entry in entries]
+        path_to_index = os.path.join(self.__path_to_shards, INDEX_FILE_NAME)
+        path_to_temporary = f"{path_to_index}.tmp"
+        with open(path_to_temporary, "wb") as file:
+            np.savez(file,
+                     image_numbers=np.array(list(self.__entries), dtype=np.int64),
+                     shard_ids=np.array([entry[0] for entry in entries], dtype=np.int32),
+                     offsets=np.array([entry[1] for entry in entries], dtype=np.int64),
+                     lengths=np.array([entry[2] for entry in entries], dtype=np.int64),
+                     label_counts=np.array([len(entry_labels) for entry_labels in labels], dtype=np.int32),
+                     labels=np.concatenate(labels) if labels else np.zeros((0, LABEL_COLUMNS), dtype=np.float32))
+        os.replace(path_to_temporary, path_to_index)
+        self.__write_meta()
+
+        # Entries of the journal are in the index now, journal left after a crash before this point is read again
+        if self.__journal_file is not None:
+            self.__journal_file.close()
+            self.__journal_file = None
+        path_to_journal = os.path.join(self.__path_to_shards, INDEX_JOURNAL_FILE_NAME)
+        if os.path.exists(path_to_journal):
+            os.remove(path_to_journal)
+
+    def __write_meta(self):
+        path_to_meta = os.path.join(self.__path_to_shards, META_FILE_NAME)
+        path_to_temporary = f"{path_to_meta}.tmp"
+        with open(path_to_temporary, "w", encoding="utf-8") as file:
+            json.dump({"image_format": self.__image_format, "seed": self.__seed, "number_of_images": len(self.__entries)}, file)
+        os.replace(path_to_temporary, path_to_meta)
+
+
+class ShardReader:
+    """
+    Class used to read images and labels written by ShardWriter.
+    Shard files are memory mapped, so any image can be read without reading other images.
+    Only images in index.npz are read, images of an interrupted writer are added to it when generation is resumed.
+    """
+    def __init__(self, path_to_shards: str):
+        self.__path_to_shards: str = path_to_shards
+
+        with np.load(os.path.join(path_to_shards, INDEX_FILE_NAME)) as index:
+            self.image_numbers: np.ndarray = index["image_numbers"]
+            self.__shard_ids: np.ndarray = index["shard_ids"]
+            self.__offsets: np.ndarray = index["offsets"]
+            self.__lengths: np.ndarray = index["lengths"]
+            self.labels: np.ndarray = index["labels"]
+            label_counts = index["label_counts"]
+
+        self.__label_offsets: np.ndarray = np.concatenate([[0], np.cumsum(label_counts, dtype=np.int64)])
+
+        with open(os.path.join(path_to_shards, META_FILE_NAME), "r", encoding="utf-8") as file:
+            self.image_format: str = json.load(file)["image_format"]
+
+        self.__shards: dict[int, mmap.mmap] = {}
+
+    def __len__(self) -> int:
+        return len(self.image_numbers)
+
+    def __get_shard(self, shard_id: int) -> mmap.mmap:
+        if shard_id not in self.__shards:
+            path_to_shard = os.path.join(self.__path_to_shards, f"shard-{shard_id:05d}.bin")
+            with open(path_to_shard, "rb") as file:
+                self.__shards[shard_id] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.__shards[shard_id]
+
+    def get_encoded_image(self, i: int) -> bytes:
+        """Function returns encoded bytes of the i-th image."""
+        offset = int(self.__offsets[i])
+        return self.__get_shard(int(self.__shard_ids[i]))[offset:offset + int(self.__lengths[i])]
+
+    def get_labels(self, i: int) -> np.ndarray:
+        """Function returns array of shape (n, 5) with labels of the i-th image."""
+        return self.labels[self.__label_offsets[i]:self.__label_offsets[i + 1]]
+
+    def __getitem__(self, i: int) -> tuple[Image.Image, np.ndarray]:
+        """
+        Function returns decoded i-th image and its labels.
+        """
+        return decode_image(self.get_encoded_image(i), self.image_format), self.get_labels(i)
+
+    def close(self) -> None:
+        """Function closes memory mapped shard files."""
+        for shard in self.__shards.values():
+            shard.close()
+        self.__shards.clear()
+
+    def export_ultralytics(self, destination_path: str) -> None:
+        """
+        Function writes images and labels to destination_path/images and destination_path/labels folders
+        in the layout used by ultralytics. Encoded images are written without decoding.
+        """
+        os.makedirs(os.path.join(destination_path, "images"), exist_ok=True)
+        os.makedirs(os.path.join(destination_path, "labels"), exist_ok=True)
+
+        for i, image_number in enumerate(self.image_numbers):
+            path_to_image = os.path.join(destination_path, "images", f"{image_number}.{self.image_format}")
+            with open(path_to_image, "wb") as file:
+                file.write(self.get_encoded_image(i))
+
+            path_to_label = os.path.join(destination_path, "labels", f"{image_number}.txt")
+            with open(path_to_label, "w", encoding="utf-8") as file:
+                file.write("\n".join(format_label(label) for label in self.get_labels(i)))
+
+        print(f"Exported {len(self)} images to {destination_path}")
+
+
+def read_entries(path_to_shards: str) -> dict[int, tuple[int, int, int, np.ndarray]]:
+    """
+    Function reads entries of the index of shards and of the journal of images appended after the index was written.
+    return: dict mapping image number to tuple with shard id, offset and length of the image and its labels,
+    in order of appending.
+    """
+    entries = {}
+    path_to_index = os.path.join(path_to_shards, INDEX_FILE_NAME)
+    if os.path.exists(path_to_index):
+        with np.load(path_to_index) as index:
+            label_offsets = np.concatenate([[0], np.cumsum(index["label_counts"], dtype=np.int64)])
+            labels = index["labels"]
+            columns = (index["image_numbers"].tolist(), index["shard_ids"].tolist(), index["offsets"].tolist(), index["lengths"].tolist())
+            for i, (image_number, shard_id, offset, length) in enumerate(zip(*columns)):
+                entries[image_number] = (shard_id, offset, length, labels[label_offsets[i]:label_offsets[i + 1]])
+
+    path_to_journal = os.path.join(path_to_shards, INDEX_JOURNAL_FILE_NAME)
+    if os.path.exists(path_to_journal):
+        with open(path_to_journal, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    image_number, shard_id, offset, length, labels = json.loads(line)
+                except ValueError:
+                    continue # Last line can be cut if the process was killed while writing it
+                entries.pop(image_number, None)
+                entries[image_number] = (shard_id, offset, length,
+                                         np.array(labels, dtype=np.float32).reshape(-1, LABEL_COLUMNS))
+    return entries
+
+
+def read_image_numbers(path_to_shards: str) -> np.ndarray:
+    """
+    Function returns numbers of images stored in shards of the folder, including images recorded only in the journal
+    of an interrupted writer, empty array if the folder has no shards.
+    """
+    return np.array(list(read_entries(path_to_shards)), dtype=np.int64)
+
+
+def read_meta(path_to_shards: str) -> dict | None:
+    """
+    Function reads meta data of shards (image format, seed of the dataset and number of images), None if there is none.
+    """
+    path_to_meta = os.path.join(path_to_shards, META_FILE_NAME)
+    if not os.path.exists(path_to_meta):
+        return None
+
+    with open(path_to_meta, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def format_label(label: np.ndarray) -> str:
+    """
+    Function formats one row of the labels table as a line in YOLOv8 format.
+    """
+    class_id, x_center, y_center, width, height = label.tolist()
+    return f"{int(class_id)} {x_center} {y_center} {width} {height}"
@@ -1,10 +1,14 @@
 import os
-import shutil
-from utils import clear_folder
-from scripts.xml_parser import XMLParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from utils import clear_folder, index_folder, materialize_files
+from scripts.xml_parser import XMLParser, format_annotation
 
 os.chdir("/home/bohdan/code/aircraft-classification/data")
 
+ANNOTATIONS_FOLDER = "dataset/Annotations/Horizontal Bounding Boxes"
+
 
 with open("dataset/ImageSets/Main/train.txt", "r", encoding="utf-8") as file:
     TRAIN_IMAGES: set[int] = set(map(int, file.read().split("\n")))
@@ -13,21 +17,32 @@ with open("dataset/ImageSets/Main/test.txt", "r", encoding="utf-8") as file:
     VAL_IMAGES: set[int] = set(map(int, file.read().split("\n")))
 
 
-def copy_images():
+def copy_images(mode: str="copy"):
+    """
+    Function places images to train and val folders.
+    mode: "copy", "hardlink", "symlink" or "reflink", see utils.materialize_files.
+    """
     clear_folder("yolov8-format-dataset/images/train")
     clear_folder("yolov8-format-dataset/images/val")
 
-    for image in os.listdir("dataset/JPEGImages"):
-        img_num = int(os.path.basename(image).split('.')[0])
+    images_index = index_folder("dataset/JPEGImages")
+    splits = {"train": [], "val": []}
+    for image_name in images_index:
+        img_num = int(image_name)
 
         if img_num in TRAIN_IMAGES:
-            shutil.copy(f"dataset/JPEGImages/{image}", "yolov8-format-dataset/images/train")
+            splits["train"].append(image_name)
         elif img_num in VAL_IMAGES:
-            shutil.copy(f"dataset/JPEGImages/{image}", "yolov8-format-dataset/images/val")
+            splits["val"].append(image_name)
         else:
             raise ValueError("Image number are not present in any of the sets")
 
-    print("Images copied")
+    bytes_avoided = 0
+    for split_name, image_names in splits.items():
+        bytes_avoided += materialize_files("dataset/JPEGImages", image_names, f"yolov8-format-dataset/images/{split_name}",
+                                           mode=mode, folder_index=images_index)
+
+    print(f"Images copied, {bytes_avoided / 2**20:.1f} MiB were not copied")
 
 
 def format_labels():
@@ -48,3 +63,56 @@ def format_labels():
             raise ValueError("Label number are not present in any of the sets")
     
     print("Labels created")
+
+
+def convert_label_file(label_file: str, class_mapping: dict[str, int]=None) -> tuple[Counter, Counter]:
+    """
+    Function converts one .xml annotation to YOLOv8 label file in the train or val folder.
+    :param label_file: name of the file in the annotations folder.
+    :param class_mapping: dict mapping class name to class id, objects of other classes are skipped.
+    return: tuple with counters of all classes in the file and of classes written to the label file.
+    """
+    label_num = int(os.path.basename(label_file).split('.')[0])
+
+    if label_num in TRAIN_IMAGES:
+        path_to_label = f"yolov8-format-dataset/labels/train/{label_num}.txt"
+    elif label_num in VAL_IMAGES:
+        path_to_label = f"yolov8-format-dataset/labels/val/{label_num}.txt"
+    else:
+        raise ValueError("Label number are not present in any of the sets")
+
+    lines, class_names = format_annotation(os.path.join(ANNOTATIONS_FOLDER, label_file), class_mapping)
+    with open(path_to_label, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines))
+
+    all_classes = Counter(class_names)
+    if class_mapping is None:
+        return all_classes, all_classes
+    return all_classes, Counter(name for name in class_names if name in class_mapping)
+
+
+def format_labels_parallel(class_mapping: dict[str, int]=None, workers: int=None) -> dict[str, Counter]:
+    """
+    Function converts all annotations to YOLOv8 format in a process pool like format_labels.
+    Annotations are parsed incrementally, classes are filtered and counted in the same pass.
+    :param class_mapping: dict mapping class name to class id, objects of other classes are skipped.
+    If None, all objects are written with class id equal to the number in the class name minus one.
+    :param workers: int number of processes, number of CPUs if None.
+    return: dict with counters of all classes found and of classes written to label files.
+    """
+    clear_folder("yolov8-format-dataset/labels/train")
+    clear_folder("yolov8-format-dataset/labels/val")
+
+    label_files = [entry.name for entry in os.scandir(ANNOTATIONS_FOLDER) if entry.is_file()]
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(label_files) // (workers * 4))
+
+    class_statistics = {"found": Counter(), "written": Counter()}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for found, written in executor.map(convert_label_file, label_files, repeat(class_mapping), chunksize=chunksize):
+            class_statistics["found"].update(found)
+            class_statistics["written"].update(written)
+
+    print(f"Labels created for {len(label_files)} files, "
+          f"{sum(class_statistics['written'].values())} of {sum(class_statistics['found'].values())} objects written")
+    return class_statistics
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+STRIP_ROWS = 256 # Rows of the image processed at once, temporary arrays have size of one strip instead of the whole image
+NOISE_TILE_SIZE = 128
+
+
+class Interference:
+    """
+    Class used to change sharpness of uint8 image arrays and add gaussian noise to them in place.
+    Images are processed by strips of rows with int16 and float32 temporaries of the strip size,
+    so the whole image is never copied to a float array.
+    Random values are drawn from one numpy.random.Generator, which can be reseeded for every image.
+    If noise_bank_size > 0, tiles of standard normal noise are generated once and random tiles are added
+    instead of drawing new noise for every pixel.
+    """
+    def __init__(self, seed: int=None, noise_bank_size: int=0, noise_bank_seed: int=0, strip_rows: int=STRIP_ROWS):
+        """
+        :param seed: int seed of the generator used for noise.
+        :param noise_bank_size: int number of precomputed noise tiles, 0 disables the bank.
+        :param noise_bank_seed: int seed of the noise tiles, bank doesn't depend on seeds of images.
+        :param strip_rows: int number of rows processed at once.
+        """
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.__noise_bank_size: int = noise_bank_size
+        self.__noise_bank_seed: int = noise_bank_seed
+        self.__noise_banks: dict[int, np.ndarray] = {}
+        self.__strip_rows: int = strip_rows
+
+    def seed(self, seed: int) -> None:
+        """Function reseeds the generator used for noise."""
+        self.rng = np.random.default_rng(seed)
+
+    def sharpen(self, array: np.ndarray, factor: float) -> np.ndarray:
+        """
+        Function changes sharpness of uint8 array with shape (height, width, channels) in place,
+        equivalent of PIL.ImageEnhance.Sharpness: factor < 1 blurs the image, factor > 1 sharpens it.
+        Result is smooth + factor * (image - smooth), where smooth is PIL SMOOTH filter equal to
+        (box + 4 * image) / 13 with box being the sum of 3x3 neighbourhood, so it is computed
+        as a * image + b * box with the box sum done as two separable passes.
+        Border pixels are left unchanged like in PIL.
+        """
+        height, width = array.shape[:2]
+        if height < 3 or width < 3 or factor == 1:
+            return array
+
+        image_weight = np.float32(factor + 4 * (1 - factor) / 13)
+        box_weight = np.float32((1 - factor) / 13)
+
+        # Rows above the strip are already changed, so the original last row of the previous strip is kept
+        above = array[0].astype(np.int16)
+        for start in range(1, height - 1, self.__strip_rows):
+            end = min(start + self.__strip_rows, height - 1)
+            rows = array[start - 1:end + 1].astype(np.int16)
+            rows[0] = above
+            above = rows[-2].copy()
+
+            vertical = rows[:-2] + rows[1:-1] + rows[2:]
+            box = vertical[:, :-2] + vertical[:, 1:-1] + vertical[:, 2:]
+
+            result = box.astype(np.float32)
+            result *= box_weight
+            result += image_weight * rows[1:-1, 1:-1]
+            np.rint(result, out=result)
+            np.clip(result, 0, 255, out=result)
+            array[start:end, 1:-1] = result
+
+        return array
+
+    def add_noise(self, array: np.ndarray, std: float, mean: float=0) -> np.ndarray:
+        """
+        Function adds gaussian noise to uint8 array in place, values are saturated to range from 0 to 255.
+        Noise is rounded to int16 and added to int16 copy of one strip at a time.
+        """
+        noise_bank = self.__get_noise_bank(array.shape[-1]) if self.__noise_bank_size > 0 else None
+        strip_rows = NOISE_TILE_SIZE if noise_bank is not None else self.__strip_rows
+
+        for start in range(0, array.shape[0], strip_rows):
+            strip = array[start:start + strip_rows].astype(np.int16)
+            if noise_bank is None:
+                noise = self.rng.standard_normal(strip.shape, dtype=np.float32)
+            else:
+                noise = self.__tile_noise(noise_bank, strip.shape)
+
+            noise *= np.float32(std)
+            noise += np.float32(mean)
+            strip += np.rint(noise, out=noise).astype(np.int16)
+            np.clip(strip, 0, 255, out=strip)
+            array[start:start + strip_rows] = strip
+
+        return array
+
+    def __get_noise_bank(self, channels: int) -> np.ndarray:
+        """
+        Function returns float32 array of shape (noise_bank_size, tile size, tile size, channels) with standard normal noise.
+        """
+        if channels not in self.__noise_banks:
+            rng = np.random.default_rng(self.__noise_bank_seed)
+            self.__noise_banks[channels] = rng.standard_normal(
+                (self.__noise_bank_size, NOISE_TILE_SIZE, NOISE_TILE_SIZE, channels), dtype=np.float32)
+        return self.__noise_banks[channels]
+
+    def __tile_noise(self, noise_bank: np.ndarray, shape: tuple) -> np.ndarray:
+        """
+        Function fills array of the given shape with randomly chosen tiles of the noise bank.
+        """
+        height, width = shape[:2]
+        number_of_tiles = -(-width // NOISE_TILE_SIZE)
+        tile_ids = self.rng.integers(len(noise_bank), size=number_of_tiles)
+        noise = np.concatenate(noise_bank[tile_ids, :height], axis=1)
+        return noise[:, :width]
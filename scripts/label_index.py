@@ -0,0 +1,190 @@
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from label_stats import read_label_file, compute_statistics
+
+
+LABEL_INDEX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aircraft-classification", "label-index")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+class LabelIndex:
+    """
+    Class used to parse folder with YOLO labels once and answer queries about labels without reading text files again.
+    Labels are stored in columns: sorted names of label files, their modification times and sizes,
+    offsets of every file into one float32 array with boxes of all files, and optional sizes of images.
+    Columns are saved to a .npz cache file, on refresh only new or changed files are parsed.
+    """
+    def __init__(self, path_to_labels: str, path_to_images: str=None, path_to_cache: str=None, workers: int=8):
+        """
+        :param path_to_labels: path to folder with .txt labels.
+        :param path_to_images: path to folder with images, if given image sizes are stored for queries in pixels.
+        :param path_to_cache: path to the cache file, file in LABEL_INDEX_CACHE_DIR named by labels and images folders if None.
+        :param workers: int number of threads used to parse changed files.
+        """
+        self.__path_to_labels: str = os.path.abspath(path_to_labels)
+        self.__path_to_images: str = os.path.abspath(path_to_images) if path_to_images is not None else None
+        self.__workers: int = workers
+        if path_to_cache is None:
+            # Index without images has unknown image sizes, so it is cached separately from index with images
+            folder_hash = hashlib.sha1(f"{self.__path_to_labels}|{self.__path_to_images}".encode("utf-8")).hexdigest()
+            path_to_cache = os.path.join(LABEL_INDEX_CACHE_DIR, f"{folder_hash}.npz")
+        self.__path_to_cache: str = path_to_cache
+
+        self.names: np.ndarray = np.zeros(0, dtype=str)
+        self.mtimes: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.sizes: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        self.boxes: np.ndarray = np.zeros((0, 5), dtype=np.float32)
+        self.image_sizes: np.ndarray = np.zeros((0, 2), dtype=np.int32)
+
+        self.__read_cache()
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def image_ids(self) -> np.ndarray:
+        """Property returns index of the label file of every box."""
+        return np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+
+    @property
+    def stems(self) -> list[str]:
+        """Property returns names of label files without extension."""
+        return [os.path.splitext(name)[0] for name in self.names]
+
+    def get_labels(self, name: str) -> np.ndarray:
+        """
+        Function returns array of shape (n, 5) with labels of the file with given name (with or without .txt).
+        """
+        if not name.endswith(".txt"):
+            name += ".txt"
+        i = int(np.searchsorted(self.names, name))
+        if i == len(self.names) or self.names[i] != name:
+            raise KeyError(f"Label file {name} is not in the index")
+        return self.boxes[self.offsets[i]:self.offsets[i + 1]]
+
+    def images_with_class(self, class_id: int) -> list[str]:
+        """
+        Function returns names of label files containing at least one object of the class.
+        """
+        ids = np.unique(self.image_ids[self.boxes[:, 0] == class_id])
+        return self.names[ids].tolist()
+
+    def boxes_smaller_than(self, pixels: float, image_size: tuple[int, int]=None) -> tuple[list[str], np.ndarray]:
+        """
+        Function finds boxes with the larger side smaller than given number of pixels.
+        :param image_size: tuple with width and height of all images,
+        if None sizes of images stored in the index are used.
+        return: tuple with names of label files of found boxes and array of found boxes.
+        """
+        image_ids = self.image_ids
+        if image_size is not None:
+            sizes = np.broadcast_to(np.array(image_size, dtype=np.float32), (len(image_ids), 2))
+        else:
+            sizes = self.image_sizes[image_ids].astype(np.float32)
+            if np.any(sizes < 0):
+                raise ValueError("Image sizes are unknown, pass image_size or path_to_images")
+
+        pixel_sizes = self.boxes[:, 3:5] * sizes
+        mask = pixel_sizes.max(axis=1) < pixels
+        return self.names[image_ids[mask]].tolist(), self.boxes[mask]
+
+    def class_count_matrix(self, number_of_classes: int=None) -> np.ndarray:
+        """
+        Function returns int array of shape (number of files, number of classes)
+        with number of objects of every class in every file.
+        """
+        class_ids = self.boxes[:, 0].astype(np.int64)
+        if number_of_classes is None:
+            number_of_classes = int(class_ids.max()) + 1 if len(class_ids) else 0
+
+        matrix = np.zeros((len(self.names), number_of_classes), dtype=np.int64)
+        np.add.at(matrix, (self.image_ids, class_ids), 1)
+        return matrix
+
+    def statistics(self, number_of_classes: int=None) -> dict:
+        """Function returns statistics of indexed labels, see label_stats.compute_statistics."""
+        return compute_statistics(self.boxes, self.image_ids, len(self.names), number_of_classes)
+
+    def refresh(self) -> None:
+        """
+        Function updates index with the current state of the folder.
+        Files with unchanged modification time and size are taken from the index, others are parsed again.
+        If path_to_images is given, sizes of images that were unknown are read again.
+        """
+        entries = sorted((entry for entry in os.scandir(self.__path_to_labels)
+                          if entry.name.endswith(".txt") and entry.is_file()), key=lambda entry: entry.name)
+        stats = [entry.stat() for entry in entries]
+        names = np.array([entry.name for entry in entries], dtype=str)
+        mtimes = np.array([stat.st_mtime_ns for stat in stats], dtype=np.int64)
+        sizes = np.array([stat.st_size for stat in stats], dtype=np.int64)
+
+        old_positions = {name: i for i, name in enumerate(self.names.tolist())}
+        reused = [old_positions.get(name) for name in names.tolist()]
+        changed = [i for i, old in enumerate(reused)
+                   if old is None or self.mtimes[old] != mtimes[i] or self.sizes[old] != sizes[i]]
+        unknown_sizes = []
+        if self.__path_to_images is not None:
+            changed_set = set(changed)
+            unknown_sizes = [i for i, old in enumerate(reused) if i not in changed_set and self.image_sizes[old, 0] < 0]
+
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            parsed = dict(zip(changed, executor.map(read_label_file,
+                                                    (os.path.join(self.__path_to_labels, names[i]) for i in changed))))
+            new_image_sizes = dict(zip(changed + unknown_sizes,
+                                       executor.map(self.__read_image_size, (names[i] for i in changed + unknown_sizes))))
+
+        found_sizes = any(new_image_sizes[i][0] >= 0 for i in unknown_sizes)
+        if not changed and not found_sizes and len(names) == len(self.names):
+            return
+
+        arrays, image_sizes = [], np.zeros((len(names), 2), dtype=np.int32)
+        for i, old in enumerate(reused):
+            arrays.append(parsed[i] if i in parsed else self.boxes[self.offsets[old]:self.offsets[old + 1]])
+            image_sizes[i] = new_image_sizes[i] if i in new_image_sizes else self.image_sizes[old]
+
+        self.names, self.mtimes, self.sizes, self.image_sizes = names, mtimes, sizes, image_sizes
+        self.offsets = np.concatenate([[0], np.cumsum([len(array) for array in arrays], dtype=np.int64)])
+        self.boxes = np.concatenate(arrays) if arrays else np.zeros((0, 5), dtype=np.float32)
+        self.__write_cache()
+
+    def __read_image_size(self, label_name: str) -> tuple[int, int]:
+        """
+        Function reads width and height of the image of the label file from the image header, (-1, -1) if unknown.
+        """
+        if self.__path_to_images is None:
+            return -1, -1
+
+        stem = os.path.splitext(label_name)[0]
+        for extension in IMAGE_EXTENSIONS:
+            path_to_image = os.path.join(self.__path_to_images, stem + extension)
+            if os.path.exists(path_to_image):
+                with Image.open(path_to_image) as image:
+                    return image.size
+        return -1, -1
+
+    def __read_cache(self) -> None:
+        if not os.path.exists(self.__path_to_cache):
+            return
+        try:
+            with np.load(self.__path_to_cache) as cache:
+                self.names = cache["names"]
+                self.mtimes = cache["mtimes"]
+                self.sizes = cache["sizes"]
+                self.offsets = cache["offsets"]
+                self.boxes = cache["boxes"]
+                self.image_sizes = cache["image_sizes"]
+        except (OSError, KeyError, ValueError):
+            pass # Broken cache is rebuilt by refresh
+
+    def __write_cache(self) -> None:
+        os.makedirs(os.path.dirname(self.__path_to_cache) or ".", exist_ok=True)
+        path_to_temporary = f"{self.__path_to_cache}.tmp"
+        with open(path_to_temporary, "wb") as file:
+            np.savez(file, names=self.names, mtimes=self.mtimes, sizes=self.sizes, offsets=self.offsets,
+                     boxes=self.boxes, image_sizes=self.image_sizes)
+        os.replace(path_to_temporary, self.__path_to_cache)
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+SIZE_BINS = np.linspace(0, 1, 21) # Bins of box width, height and sqrt of area relative to the image size
+ASPECT_BINS = np.logspace(-2, 2, 21, base=2) # Bins of box width to height ratio from 1/4 to 4
+
+
+def read_label_file(path_to_label: str) -> np.ndarray:
+    """
+    Function reads label file in YOLOv8 format.
+    return: float32 array of shape (n, 5) with class id, x center, y center, width and height of every object.
+    """
+    with open(path_to_label, "r", encoding="utf-8") as file:
+        values = file.read().split()
+    return np.array(values, dtype=np.float32).reshape(-1, 5)
+
+
+def compute_statistics(labels: np.ndarray, image_ids: np.ndarray, number_of_images: int, number_of_classes: int=None) -> dict:
+    """
+    Function computes statistics of labels of one dataset split.
+    return: dict with number of images and objects, per class counts of objects and images containing the class,
+    histograms of box width, height, sqrt of area and aspect ratio, and distribution of number of objects per image.
+    Raises ValueError if a class id is not less than number_of_classes.
+    """
+    class_ids = labels[:, 0].astype(np.int64)
+    widths, heights = labels[:, 3], labels[:, 4]
+    if number_of_classes is None:
+        number_of_classes = int(class_ids.max()) + 1 if len(class_ids) else 0
+    if len(class_ids) and (class_ids.min() < 0 or class_ids.max() >= number_of_classes):
+        invalid_ids = np.unique(class_ids[(class_ids < 0) | (class_ids >= number_of_classes)])
+        raise ValueError(f"class ids have to be in range from 0 to number_of_classes - 1 ({number_of_classes - 1}), "
+                         f"found {invalid_ids.tolist()}")
+
+    objects_per_image = np.bincount(image_ids, minlength=number_of_images)
+    image_class_pairs = np.unique(image_ids * max(number_of_classes, 1) + class_ids)
+    aspect_ratios = widths / np.maximum(heights, 1e-9)
+
+    return {
+        "number_of_images": number_of_images,
+        "number_of_objects": len(labels),
+        "class_counts": np.bincount(class_ids, minlength=number_of_classes),
+        "images_per_class": np.bincount(image_class_pairs % max(number_of_classes, 1), minlength=number_of_classes),
+        "width_histogram": np.histogram(widths, bins=SIZE_BINS),
+        "height_histogram": np.histogram(heights, bins=SIZE_BINS),
+        "size_histogram": np.histogram(np.sqrt(widths * heights), bins=SIZE_BINS),
+        "aspect_histogram": np.histogram(aspect_ratios, bins=ASPECT_BINS),
+        "objects_per_image": np.bincount(objects_per_image),
+        "empty_images": int(np.count_nonzero(objects_per_image == 0))
+    }
+
@@ -0,0 +1,80 @@
+import math
+from collections import defaultdict
+
+
+MAX_COVERAGE = 0.5 # Plane is rejected if more than this part of its box or of the box of a placed plane is covered
+
+
+def rotated_size(size: tuple[float, float], angle: float) -> tuple[float, float]:
+    """
+    Function returns width and height of the axis aligned box of the rectangle of the given size rotated by angle in degrees.
+    """
+    width, height = size
+    cos, sin = abs(math.cos(math.radians(angle))), abs(math.sin(math.radians(angle)))
+    return width * cos + height * sin, width * sin + height * cos
+
+
+def box_overlap(box: tuple, other_box: tuple) -> tuple[float, float]:
+    """
+    Function computes overlap of two boxes given by left, top, right and bottom coordinates.
+    return: tuple with intersection over union and largest part of one of the boxes covered by the other.
+    """
+    width = min(box[2], other_box[2]) - max(box[0], other_box[0])
+    height = min(box[3], other_box[3]) - max(box[1], other_box[1])
+    if width <= 0 or height <= 0:
+        return 0.0, 0.0
+
+    intersection = width * height
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    other_area = (other_box[2] - other_box[0]) * (other_box[3] - other_box[1])
+    return intersection / (area + other_area - intersection), intersection / min(area, other_area)
+
+
+class FootprintGrid:
+    """
+    Class used to find overlaps of plane footprints with planes that are already placed on the airbase image.
+    Boxes are registered in every cell of a uniform grid they touch, so a check looks only at boxes
+    in a few cells around the new box instead of all placed boxes. With cell size close to the size of a plane
+    every box touches at most four cells and a check takes constant time for any number of placed planes.
+    """
+    def __init__(self, cell_size: float, max_iou: float=0.0, max_coverage: float=MAX_COVERAGE):
+        """
+        :param max_iou: float largest allowed intersection over union of two boxes.
+        :param max_coverage: float largest allowed part of a box covered by another box.
+        """
+        if cell_size <= 0:
+            raise ValueError("cell_size parameter has to be positive")
+
+        self.__cell_size: float = cell_size
+        self.__max_iou: float = max_iou
+        self.__max_coverage: float = max_coverage
+        self.__cells: defaultdict[tuple[int, int], list[int]] = defaultdict(list)
+        self.boxes: list[tuple] = []
+
+    def __get_cells(self, box: tuple):
+        x0, y0, x1, y1 = (math.floor(coordinate / self.__cell_size) for coordinate in box)
+        for column in range(x0, x1 + 1):
+            for row in range(y0, y1 + 1):
+                yield column, row
+
+    def fits(self, box: tuple) -> bool:
+        """
+        Function checks that the box doesn't overlap placed boxes more than allowed.
+        """
+        checked = set()
+        for cell in self.__get_cells(box):
+            for box_id in self.__cells.get(cell, ()):
+                if box_id in checked:
+                    continue
+                checked.add(box_id)
+                iou, coverage = box_overlap(box, self.boxes[box_id])
+                if iou > self.__max_iou or coverage > self.__max_coverage:
+                    return False
+        return True
+
+    def insert(self, box: tuple) -> None:
+        """Function registers box of a placed plane."""
+        box_id = len(self.boxes)
+        self.boxes.append(box)
+        for cell in self.__get_cells(box):
+            self.__cells[cell].append(box_id)
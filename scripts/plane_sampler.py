@@ -0,0 +1,103 @@
+import random
+
+
+class AliasTable:
+    """
+    Class used to draw indices with given weights in constant time with Walker's alias method (Vose's construction).
+    Every index gets a column of equal height split between the index and its alias, so a draw needs one random number.
+    Random numbers are taken from the random module, so draws depend on its seed.
+    """
+    def __init__(self, weights: list[float]):
+        if not weights or any(weight < 0 for weight in weights) or sum(weights) <= 0:
+            raise ValueError("weights have to be non-negative numbers with positive sum")
+
+        n = len(weights)
+        total = sum(weights)
+        scaled = [weight * n / total for weight in weights]
+        self.__probabilities: list[float] = [1.0] * n
+        self.__aliases: list[int] = list(range(n))
+
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            i, j = small.pop(), large.pop()
+            self.__probabilities[i] = scaled[i]
+            self.__aliases[i] = j
+            scaled[j] += scaled[i] - 1
+            (small if scaled[j] < 1 else large).append(j)
+        # Columns left in either list are full up to rounding errors, their probabilities stay equal to 1
+
+    def __len__(self) -> int:
+        return len(self.__probabilities)
+
+    def draw(self) -> int:
+        """Function draws index with probability proportional to its weight."""
+        position = random.random() * len(self.__probabilities)
+        i = int(position)
+        return i if position - i < self.__probabilities[i] else self.__aliases[i]
+
+
+def get_class_name(plane_key: str) -> str:
+    """Function returns class name of the plane image key, for example su24 for su24_1."""
+    return plane_key[:plane_key.rfind("_")]
+
+
+def inverse_frequency_weights(class_counts: dict[str, int]) -> dict[str, float]:
+    """
+    Function returns class weights inversely proportional to numbers of objects of the classes in a dataset,
+    so rare classes are drawn more often. Classes without objects get the weight of a class with one object.
+    """
+    return {class_name: 1 / max(count, 1) for class_name, count in class_counts.items()}
+
+
+class ClassBalancedSampler:
+    """
+    Class used to choose plane images so that classes are drawn with target proportions instead of proportionally
+    to the number of images of every class. Weight of a class is split equally between its images and one alias table
+    is built for every category of spawn points ("s" for points of small planes, "b" for points of any plane),
+    classes that can't be placed on points of a category are not drawn for them. If no class of a category
+    has positive weight, for example weights of a dataset with only big planes, its plane images are chosen uniformly.
+    """
+    def __init__(self, keys_by_category: dict[str, list[str]], class_weights: dict[str, float]):
+        """
+        :param keys_by_category: dict mapping category of spawn points to keys of plane images that can be placed on them.
+        :param class_weights: dict mapping class name to its target weight, classes without weight are not drawn.
+        """
+        self.class_weights: dict[str, float] = class_weights
+        self.__keys: dict[str, list[str]] = {}
+        self.__tables: dict[str, AliasTable] = {}
+
+        for category, keys in keys_by_category.items():
+            images_per_class = {}
+            for key in keys:
+                images_per_class[get_class_name(key)] = images_per_class.get(get_class_name(key), 0) + 1
+
+            weights = [class_weights.get(get_class_name(key), 0) / images_per_class[get_class_name(key)] for key in keys]
+            if sum(weights) <= 0:
+                weights = [1.0] * len(keys) # Category without weighted classes keeps uniform choice of plane images
+            self.__keys[category] = keys
+            self.__tables[category] = AliasTable(weights)
+
+    def choose(self, category: str) -> str:
+        """
+        Function draws key of the plane image for the spawn point category.
+        """
+        if category not in self.__tables:
+            raise ValueError("Incorrect plane type")
+        return self.__keys[category][self.__tables[category].draw()]
+
+
+def format_class_histogram(histogram: dict[str, int], class_weights: dict[str, float]=None) -> str:
+    """
+    Function formats numbers of placed planes of every class with their shares
+    and target shares of the class weights if they are given.
+    """
+    total = sum(histogram.values())
+    total_weight = sum(class_weights.values()) if class_weights else 0
+    lines = [f"{'class':<16}{'planes':>8}{'share':>8}{'target':>8}"]
+    for class_name in sorted(set(histogram) | set(class_weights or {})):
+        count = histogram.get(class_name, 0)
+        share = count / total if total > 0 else 0
+        target = f"{class_weights.get(class_name, 0) / total_weight:.1%}" if total_weight > 0 else "-"
+        lines.append(f"{class_name:<16}{count:>8}{share:>8.1%}{target:>8}")
+    return "\n".join(lines)
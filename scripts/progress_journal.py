@@ -0,0 +1,100 @@
+import os
+import json
+import threading
+from concurrent.futures import Future
+from typing import Iterable
+import numpy as np
+from PIL import Image
+
+
+JOURNAL_FILE_NAME = "progress.journal"
+
+
+def is_image_complete(path_to_image: str, path_to_label: str) -> bool:
+    """
+    Function checks that image and its labels were written completely: the image file can be decoded
+    and every line of the labels file has class id and four box coordinates.
+    Generated images always contain at least one plane, so an empty labels file is treated as incomplete.
+    """
+    if not os.path.isfile(path_to_image) or not os.path.isfile(path_to_label):
+        return False
+
+    try:
+        if path_to_image.endswith(".npy"):
+            np.load(path_to_image, mmap_mode="r", allow_pickle=False)
+        else:
+            with Image.open(path_to_image) as image:
+                image.verify()
+
+        with open(path_to_label, "r", encoding="utf-8") as file:
+            lines = file.read().splitlines()
+        return len(lines) > 0 and all(len(list(map(float, line.split()))) == 5 for line in lines)
+    except (OSError, ValueError, SyntaxError):
+        return False
+
+
+def read_journal(path_to_journal: str) -> tuple[dict | None, set[int]]:
+    """
+    Function reads journal written by ProgressJournal.
+    return: tuple with header of the journal (seed of the dataset and image codec) or None if there is no journal
+    and set of numbers of finished images.
+    """
+    if not os.path.exists(path_to_journal):
+        return None, set()
+
+    with open(path_to_journal, "r", encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    if not lines:
+        return None, set()
+
+    # Last line can be cut if the process was killed while writing it
+    completed = {int(line) for line in lines[1:] if line.strip().isdigit()}
+    return json.loads(lines[0]), completed
+
+
+class ProgressJournal:
+    """
+    Class used to record numbers of images that were completely written, so interrupted generation can be resumed.
+    Journal is a text file with JSON header (seed of the dataset and image codec) in the first line
+    and number of one finished image in every next line. Every line is flushed when it is written,
+    so after a crash the journal contains all images finished before it.
+    """
+    def __init__(self, path_to_journal: str, seed: int=None, image_codec: str="png", completed: Iterable[int]=()):
+        """
+        :param completed: numbers of already finished images, they are written to the new journal after the header.
+        """
+        self.__lock = threading.Lock()
+        self.completed: set[int] = set(completed)
+
+        lines = [json.dumps({"seed": seed, "image_codec": image_codec})] + [str(n) for n in sorted(self.completed)]
+        path_to_temporary = f"{path_to_journal}.tmp"
+        with open(path_to_temporary, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(path_to_temporary, path_to_journal)
+        self.__file = open(path_to_journal, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, image_number: int, future: Future=None) -> None:
+        """
+        Function records the image as finished.
+        :param future: Future of the background write of the image, if given the image is recorded when it is written.
+        """
+        if future is not None:
+            def record_written(future: Future):
+                if future.exception() is None:
+                    self.record(image_number)
+            future.add_done_callback(record_written)
+            return
+
+        with self.__lock:
+            self.__file.write(f"{image_number}\n")
+            self.__file.flush()
+            self.completed.add(image_number)
+
+    def close(self) -> None:
+        self.__file.close()
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Callable
+import numpy as np
+from PIL import Image
+
+
+class SpriteCache:
+    """
+    Class used to store plane images already resized to the pixel size of the airbase image.
+    Sprites are stored in least recently used order, when cache is full the least recently used sprite is removed.
+    Key of a sprite is a tuple of plane key, rotation angle and pixel size.
+    """
+    def __init__(self, max_size: int=1024):
+        if max_size < 0:
+            raise ValueError("max_size parameter has to be non-negative integer")
+
+        self.__max_size: int = max_size
+        self.__sprites: OrderedDict = OrderedDict()
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self.__sprites)
+
+    def get(self, key: tuple, make_sprite: Callable[[], Image.Image]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Function returns sprite with the given key, sprite is made with make_sprite function if it is not in the cache.
+        Returned arrays are read only, they have to be copied before modification.
+        :param key: tuple containing plane key, rotation angle and pixel size.
+        :param make_sprite: function returning resized RGBA PIL image of the plane.
+        return: tuple with float32 RGBA array of the sprite and float32 array of its alpha channel.
+        """
+        sprite = self.__sprites.get(key)
+        if sprite is not None:
+            self.__hits += 1
+            self.__sprites.move_to_end(key)
+            return sprite
+
+        self.__misses += 1
+        sprite = self.__make_entry(make_sprite())
+        if self.__max_size == 0:
+            return sprite
+
+        self.__sprites[key] = sprite
+        if len(self.__sprites) > self.__max_size:
+            self.__sprites.popitem(last=False)
+            self.__evictions += 1
+
+        return sprite
+
+    @staticmethod
+    def __make_entry(image: Image.Image) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Function converts RGBA image to read only float32 arrays of the sprite and its alpha channel.
+        """
+        rgba = np.asarray(image.convert("RGBA"), dtype=np.float32)
+        alpha = np.ascontiguousarray(rgba[..., 3:])
+        rgba.setflags(write=False)
+        alpha.setflags(write=False)
+        return rgba, alpha
+
+    def reset_stats(self) -> None:
+        """Function resets statistics, stored sprites are kept."""
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def clear(self) -> None:
+        """Function removes all sprites from the cache and resets statistics."""
+        self.__sprites.clear()
+        self.reset_stats()
+
+    @property
+    def stats(self) -> dict:
+        """Property returns dict with number of hits, misses, evictions, stored sprites and hit rate."""
+        return self.__make_stats(self.__hits, self.__misses, self.__evictions, len(self.__sprites))
+
+    @classmethod
+    def merge_stats(cls, stats: list[dict]) -> dict:
+        """
+        Function sums statistics of several caches, for example caches of pool workers.
+        return: dict in the same format as stats property.
+        """
+        return cls.__make_stats(sum(s["hits"] for s in stats),
+                                sum(s["misses"] for s in stats),
+                                sum(s["evictions"] for s in stats),
+                                sum(s["size"] for s in stats))
+
+    @staticmethod
+    def __make_stats(hits: int, misses: int, evictions: int, size: int) -> dict:
+        requests = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "size": size,
+            "hit_rate": hits / requests if requests else 0.0
+        }
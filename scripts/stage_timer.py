@@ -0,0 +1,85 @@
+from time import perf_counter
+
+
+class _NullStage:
+    """Context manager that does nothing, returned by disabled StageTimer so disabled timing costs only a method call."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, timer: "StageTimer", name: str):
+        self.__timer = timer
+        self.__name = name
+        self.__time_start: float = 0
+
+    def __enter__(self):
+        self.__time_start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__timer.add(self.__name, perf_counter() - self.__time_start)
+        return False
+
+
+class StageTimer:
+    """
+    Class used to accumulate time spent in named stages of image generation.
+    Stages are measured with "with timer.stage(name):" blocks, if the timer is disabled the block is not measured.
+    """
+    def __init__(self, enabled: bool=True):
+        self.enabled: bool = enabled
+        self.__totals: dict[str, float] = {}
+        self.__counts: dict[str, int] = {}
+
+    def stage(self, name: str):
+        """
+        Function returns context manager that adds time of its block to the stage.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add(self, name: str, elapsed_time: float) -> None:
+        """Function adds elapsed time in seconds to the stage."""
+        self.__totals[name] = self.__totals.get(name, 0) + elapsed_time
+        self.__counts[name] = self.__counts.get(name, 0) + 1
+
+    def clear(self) -> None:
+        self.__totals.clear()
+        self.__counts.clear()
+
+    @property
+    def stats(self) -> dict[str, dict]:
+        """
+        Property returns dict mapping stage name to dict with total time in seconds and number of measured blocks.
+        """
+        return {name: {"total": total, "count": self.__counts[name]} for name, total in self.__totals.items()}
+
+    def update(self, stats: dict[str, dict]) -> None:
+        """
+        Function adds statistics of another timer, for example of a pool worker, to this timer.
+        """
+        for name, stage in (stats or {}).items():
+            self.__totals[name] = self.__totals.get(name, 0) + stage["total"]
+            self.__counts[name] = self.__counts.get(name, 0) + stage["count"]
+
+    @staticmethod
+    def format_stats(stats: dict[str, dict], number_of_images: int=None) -> str:
+        """
+        Function formats statistics as a table sorted by total time with share of every stage
+        and time per image if number of images is given.
+        """
+        total_time = sum(stage["total"] for stage in stats.values())
+        lines = [f"{'stage':<16}{'total, s':>10}{'share':>8}{'calls':>8}{'ms/image':>10}"]
+        for name, stage in sorted(stats.items(), key=lambda item: -item[1]["total"]):
+            share = stage["total"] / total_time if total_time > 0 else 0
+            per_image = f"{stage['total'] / number_of_images * 1000:.2f}" if number_of_images else "-"
+            lines.append(f"{name:<16}{stage['total']:>10.3f}{share:>8.1%}{stage['count']:>8}{per_image:>10}")
+        return "\n".join(lines)
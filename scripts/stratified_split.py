@@ -0,0 +1,142 @@
+import os
+import json
+import numpy as np
+import yaml
+from label_index import LabelIndex
+from utils import index_folder
+
+
+SPLIT_NAMES = ("train", "val", "test")
+
+
+def iterative_stratification(class_counts: np.ndarray, proportions: list[float], seed: int=15) -> np.ndarray:
+    """
+    Function assigns images to splits with iterative stratification (Sechidis et al., 2011) so every split
+    receives its proportion of instances of every class, including rare classes.
+    Classes are processed from the one with the fewest remaining images, each image containing the class
+    goes to the split that needs most instances of the class, ties are broken by number of images the split needs
+    and then randomly. Images without objects are distributed by number of images splits still need.
+    :param class_counts: int array of shape (number of images, number of classes) with number of objects of every class on every image.
+    :param proportions: list of split proportions adding up to one.
+    :param seed: int seed of the random generator, the same seed gives the same split.
+    return: int array of shape (number of images,) with index of the split of every image.
+    """
+    proportions = np.asarray(proportions, dtype=np.float64)
+    if np.any(proportions < 0) or not np.isclose(proportions.sum(), 1):
+        raise ValueError("proportions parameter has to contain non-negative numbers adding up to one")
+
+    rng = np.random.default_rng(seed)
+    class_counts = np.asarray(class_counts, dtype=np.int64)
+    number_of_images = len(class_counts)
+    presence = class_counts > 0
+
+    desired_images = proportions * number_of_images
+    desired_instances = proportions[:, None] * class_counts.sum(axis=0)[None, :]
+    assignments = np.full(number_of_images, -1, dtype=np.int64)
+
+    # Random order of images, so images of a class with equal needs of splits are not assigned by their file order
+    order = rng.permutation(number_of_images)
+    remaining_presence = presence[order]
+    remaining_images = remaining_presence.sum(axis=0)
+
+    while remaining_images.any():
+        class_id = int(np.argmin(np.where(remaining_images > 0, remaining_images, np.iinfo(np.int64).max)))
+        rows = np.flatnonzero(remaining_presence[:, class_id])
+
+        for row in rows:
+            image_id = order[row]
+            needs = desired_instances[:, class_id]
+            candidates = np.flatnonzero(needs == needs.max())
+            if len(candidates) > 1:
+                image_needs = desired_images[candidates]
+                candidates = candidates[image_needs == image_needs.max()]
+            split_id = candidates[rng.integers(len(candidates))] if len(candidates) > 1 else candidates[0]
+
+            assignments[image_id] = split_id
+            desired_instances[split_id] -= class_counts[image_id]
+            desired_images[split_id] -= 1
+
+        remaining_images -= remaining_presence[rows].sum(axis=0)
+        remaining_presence[rows] = False
+
+    for image_id in order[assignments[order] == -1]:
+        split_id = int(np.argmax(desired_images))
+        assignments[image_id] = split_id
+        desired_images[split_id] -= 1
+
+    return assignments
+
+
+def write_split_manifests(image_paths: list[str], assignments: np.ndarray, split_names: list[str], destination_path: str,
+                          class_mapping: dict[str, str]) -> str:
+    """
+    Function writes <split>.txt files with absolute paths of images of every split and data.yaml referencing them,
+    so ultralytics trains on the split without copying files.
+    return: path to written data.yaml.
+    """
+    os.makedirs(destination_path, exist_ok=True)
+    data = {}
+    for split_id, split_name in enumerate(split_names):
+        split_paths = sorted(path for path, assignment in zip(image_paths, assignments) if assignment == split_id)
+        with open(os.path.join(destination_path, f"{split_name}.txt"), "w", encoding="utf-8") as file:
+            file.write("\n".join(split_paths))
+        data[split_name] = f"{split_name}.txt"
+
+    data["path"] = os.path.abspath(destination_path)
+    data["nc"] = len(class_mapping)
+    data["names"] = {int(class_id): class_name for class_id, class_name in class_mapping.items()}
+
+    path_to_data = os.path.join(destination_path, "data.yaml")
+    with open(path_to_data, "w", encoding="utf-8") as file:
+        yaml.safe_dump(data, file, sort_keys=False, allow_unicode=True)
+    return path_to_data
+
+
+def split_dataset_manifests(path_to_labels: str, path_to_images: str, destination_path: str, path_to_class_mapping: str,
+                            train_size: float, test_size: float=None, seed: int=15) -> dict[str, np.ndarray]:
+    """
+    Function splits dataset to train, validation and optionally test sets with iterative stratification by classes
+    and writes split manifests and data.yaml to destination_path, images and labels stay in their folders.
+    Labels are read with label_index.LabelIndex, so only changed label files are parsed again.
+    Ultralytics finds label of an image by replacing the last "images" folder in its path with "labels",
+    so labels folder has to be placed accordingly.
+    return: dict mapping split name to per class number of instances in the split.
+    """
+    if not 0 <= train_size <= 1:
+        raise ValueError("train_size parameter has to be non-negative number less or equal to one")
+
+    if test_size is not None and not 0 <= test_size <= 1 - train_size:
+        raise ValueError("test_size parameter has to be non-negative number less or equal to 1 - train_size")
+
+    with open(path_to_class_mapping, "r", encoding="utf-8") as file:
+        class_mapping: dict = json.load(file)
+
+    label_index = LabelIndex(path_to_labels)
+    images_index = index_folder(path_to_images)
+    missing = [stem for stem in label_index.stems if stem not in images_index]
+    if missing:
+        raise FileNotFoundError(f"No images found for {len(missing)} label files, for example {missing[0]}")
+
+    image_paths = [os.path.abspath(os.path.join(path_to_images, images_index[stem])) for stem in label_index.stems]
+    if image_paths:
+        labels_from_image = f"{os.sep}labels{os.sep}".join(image_paths[0].rsplit(f"{os.sep}images{os.sep}", 1))
+        expected_labels = os.path.join(os.path.abspath(path_to_labels), label_index.names[0])
+        if os.path.splitext(labels_from_image)[0] != os.path.splitext(expected_labels)[0]:
+            raise ValueError("Labels have to be in the folder obtained by replacing 'images' with 'labels' in path_to_images")
+
+    if test_size is None:
+        split_names, proportions = SPLIT_NAMES[:2], [train_size, 1 - train_size]
+    else:
+        split_names, proportions = SPLIT_NAMES, [train_size, 1 - train_size - test_size, test_size]
+
+    class_counts = label_index.class_count_matrix(number_of_classes=len(class_mapping))
+    assignments = iterative_stratification(class_counts, proportions, seed=seed)
+    path_to_data = write_split_manifests(image_paths, assignments, split_names, destination_path, class_mapping)
+
+    split_class_counts = {split_name: class_counts[assignments == split_id].sum(axis=0)
+                          for split_id, split_name in enumerate(split_names)}
+    print(f"Dataset split manifests written to {path_to_data}")
+    for split_name, counts in split_class_counts.items():
+        print(f"{split_name}: {int((assignments == split_names.index(split_name)).sum())} images, instances per class {counts.tolist()}")
+
+    return split_class_counts
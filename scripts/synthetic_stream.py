@@ -0,0 +1,96 @@
+import numpy as np
+from artifitial_image_generator import ImageCreator
+
+try:
+    from torch.utils.data import IterableDataset, get_worker_info
+except ImportError: # Stream can be iterated without torch, in one process
+    IterableDataset = object
+
+    def get_worker_info():
+        return None
+
+
+class SyntheticImageStream(IterableDataset):
+    """
+    Class used to render artifitial images on the fly as an iterable dataset, images are never written to disk.
+    Every epoch consists of images_per_epoch new images, image i of epoch e gets number e * images_per_epoch + i
+    and is seeded from the seed and this number, so epochs don't repeat and without replay buffer the stream contains
+    the same images for any number of workers. Numbers are split between DataLoader workers and ranks of distributed training,
+    every worker renders every (number of ranks * number of workers)-th image.
+    With replay_buffer_size > 0 every worker keeps rendered images in a buffer, new image replaces a random one when
+    the buffer is full, and then every sample is taken from the buffer with probability replay_probability
+    instead of rendering a new image.
+    Samples are tuples with uint8 RGB array of shape (height, width, 3) and float32 labels array of shape (n, 5)
+    with class id and normalized box of every plane.
+    """
+    def __init__(self, image_creator: ImageCreator, images_per_epoch: int, seed: int=0, replay_buffer_size: int=0,
+                 replay_probability: float=0.5, rank: int=0, world_size: int=1):
+        """
+        :param image_creator: ImageCreator used to render images, it can be created with path_to_save=None.
+        :param rank: int rank of the process in distributed training.
+        :param world_size: int number of processes in distributed training.
+        """
+        if images_per_epoch < 1:
+            raise ValueError("images_per_epoch parameter has to be positive integer")
+        if replay_buffer_size < 0:
+            raise ValueError("replay_buffer_size parameter has to be non-negative integer")
+        if not 0 <= replay_probability < 1:
+            raise ValueError("replay_probability parameter has to be in range from 0 to 1")
+        if not 0 <= rank < world_size:
+            raise ValueError("rank parameter has to be in range from 0 to world_size")
+
+        self.image_creator: ImageCreator = image_creator
+        self.images_per_epoch: int = images_per_epoch
+        self.seed: int = seed
+        self.replay_buffer_size: int = replay_buffer_size
+        self.replay_probability: float = replay_probability
+        self.rank: int = rank
+        self.world_size: int = world_size
+        self.epoch: int = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """
+        Function sets epoch of the next iteration. DataLoader without persistent workers iterates copies of the stream,
+        so it has to be called before every epoch to get new images.
+        """
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        return len(range(self.rank, self.images_per_epoch, self.world_size))
+
+    def __iter__(self):
+        worker_info = get_worker_info()
+        worker_id, number_of_workers = (worker_info.id, worker_info.num_workers) if worker_info is not None else (0, 1)
+        shard_id = self.rank * number_of_workers + worker_id
+        number_of_shards = self.world_size * number_of_workers
+
+        epoch = self.epoch
+        self.epoch += 1
+        first_image_number = epoch * self.images_per_epoch
+        image_numbers = range(first_image_number + shard_id, first_image_number + self.images_per_epoch, number_of_shards)
+
+        rng = np.random.default_rng([self.seed, epoch, shard_id])
+        replay_buffer = []
+        for image_number in image_numbers:
+            if 0 < self.replay_buffer_size == len(replay_buffer) and rng.random() < self.replay_probability:
+                yield replay_buffer[rng.integers(len(replay_buffer))]
+                continue
+
+            sample = self.image_creator.render_array(image_number, self.seed)
+            if len(replay_buffer) < self.replay_buffer_size:
+                replay_buffer.append(sample)
+            elif self.replay_buffer_size > 0:
+                replay_buffer[rng.integers(len(replay_buffer))] = sample
+            yield sample
+
+
+def collate_samples(samples: list[tuple[np.ndarray, np.ndarray]]) -> tuple[list[np.ndarray], np.ndarray]:
+    """
+    Function collates samples of SyntheticImageStream into a batch, images have different sizes so they are kept in a list.
+    return: tuple with list of images and float32 array of shape (n, 6) with index of the image in the batch
+    followed by the label of every plane, like batch_idx and labels in ultralytics batches.
+    """
+    images = [image for image, _ in samples]
+    labels = [np.column_stack([np.full(len(image_labels), i, dtype=np.float32), image_labels])
+              for i, (_, image_labels) in enumerate(samples)]
+    return images, np.concatenate(labels) if labels else np.zeros((0, 6), dtype=np.float32)
@@ -1,11 +1,22 @@
 import os
 import shutil
 from typing import Iterable
+from concurrent.futures import ThreadPoolExecutor
 import json
 from sklearn.model_selection import train_test_split
 import matplotlib.pyplot as plt
 import numpy as np
 from PIL import Image
+from label_index import LabelIndex
+
+try:
+    import fcntl
+except ImportError: # Copy-on-write clones are not available on Windows
+    fcntl = None
+
+
+MATERIALIZATION_MODES = ("copy", "hardlink", "symlink", "reflink")
+FICLONE = 0x40049409 # ioctl request to clone file on Btrfs, XFS and other copy-on-write file systems
 
 
 def add_gaussian_noise(img: Image.Image, mean=0, std=25) -> Image.Image:
@@ -38,16 +49,105 @@ def copy_files(path_to_folder: str, file_names: Iterable[str], destination_folde
     if not os.path.exists(destination_folder):
         os.makedirs(destination_folder, exist_ok=True)
 
+    file_names = set(file_names)
     for file in os.listdir(path_to_folder):
         if os.path.splitext(os.path.basename(file))[0] in file_names:
             shutil.copy(os.path.join(path_to_folder, file), destination_folder)
 
 
-def split_dataset_train_val_test(dataset: list[int], train_size: float, test_size: float=None) -> tuple[list[int], list[int]]:
+def index_folder(path_to_folder: str) -> dict[str, str]:
+    """
+    Function scans folder once and maps names of files without extension to their full names.
+    """
+    return {os.path.splitext(entry.name)[0]: entry.name for entry in os.scandir(path_to_folder) if entry.is_file()}
+
+
+def clone_file(source: str, destination: str) -> None:
+    """
+    Function makes copy-on-write clone of the file, raises OSError if file system doesn't support it.
+    """
+    if fcntl is None:
+        raise OSError("Copy-on-write clones are not supported on this platform")
+
+    with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+        try:
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+        except OSError:
+            destination_file.close()
+            os.remove(destination)
+            raise
+
+
+def materialize_file(source: str, destination: str, mode: str="hardlink") -> bool:
+    """
+    Function makes file available at destination path with hardlink, symlink, copy-on-write clone or copy.
+    Hardlink falls back to clone and clone falls back to copy if file system doesn't support them.
+    Existing destination file is replaced.
+    return: True if file data was not copied.
+    """
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    if mode == "symlink":
+        os.symlink(os.path.abspath(source), destination)
+        return True
+
+    if mode == "hardlink":
+        try:
+            os.link(source, destination)
+            return True
+        except OSError:
+            mode = "reflink"
+
+    if mode == "reflink":
+        try:
+            clone_file(source, destination)
+            return True
+        except OSError:
+            pass
+
+    shutil.copy(source, destination)
+    return False
+
+
+def materialize_files(path_to_folder: str, file_names: Iterable[str], destination_folder: str, mode: str="hardlink",
+                      workers: int=8, folder_index: dict[str, str]=None) -> int:
+    """
+    Function makes files from the folder which names are in file_names available in the destination folder
+    without copying their data if possible, files are processed by a thread pool.
+    path_to_folder: path to the folder with files.
+    file_names: Iterable containing file names (without extension).
+    destination_folder: path to the folder where files will be placed. If folder does not exist it will be created.
+    mode: "hardlink", "symlink", "reflink" (copy-on-write clone) or "copy".
+    folder_index: result of index_folder for path_to_folder, folder is scanned if None.
+    return: number of bytes which were not copied.
+    """
+    if mode not in MATERIALIZATION_MODES:
+        raise ValueError(f"Incorrect mode, has to be one of {MATERIALIZATION_MODES}")
+
+    os.makedirs(destination_folder, exist_ok=True)
+    if folder_index is None:
+        folder_index = index_folder(path_to_folder)
+
+    files = [folder_index[name] for name in file_names if name in folder_index]
+
+    def materialize(file: str) -> int:
+        source = os.path.join(path_to_folder, file)
+        if materialize_file(source, os.path.join(destination_folder, file), mode):
+            return os.path.getsize(source)
+        return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(materialize, files))
+
+
+def split_dataset_train_val_test(dataset: list[int], train_size: float, test_size: float=None, seed: int=15) -> tuple[list[int], list[int]]:
     """
     Function splits dataset represented as list to train and validation sets randomly.
     train_size parameter deffiens proportion in which dataset will be splited,
     it has to be two non-negative numbers adding up to one.
+    seed parameter is used for both splits, so the same seed gives the same sets.
+    For splits balanced by classes see stratified_split.split_dataset_manifests.
     return: tuple containing two sorted lists with training and validation sets. 
     """
     if not 0 <= train_size <= 1:
@@ -56,38 +156,51 @@ def split_dataset_train_val_test(dataset: list[int], train_size: float, test_siz
     if test_size is not None and not 0 <= test_size <= 1:
         raise ValueError("test_size parameter has to be non-negative number less or equal to one")
     
-    train, temp = train_test_split(dataset, train_size=train_size, random_state=15)
+    train, temp = train_test_split(dataset, train_size=train_size, random_state=seed)
 
     if test_size is not None:
-        val, test = train_test_split(temp, test_size=test_size/(1-train_size))
+        val, test = train_test_split(temp, test_size=test_size/(1-train_size), random_state=seed)
 
         return train, val, test
 
     return train, temp
 
 
-def split_dataset_files(path_to_labels: str, path_to_images: str, destination_path: str, train_size: float, test_size: float=None) -> None:
-    dataset = [os.path.splitext(os.path.basename(file))[0] for file in os.listdir(path_to_labels)]
+def split_dataset_files(path_to_labels: str, path_to_images: str, destination_path: str, train_size: float, test_size: float=None,
+                        mode: str="copy", seed: int=15) -> None:
+    """
+    Function splits dataset to train, validation and optionally test sets and places images and labels
+    of each set to destination_path/images/<set> and destination_path/labels/<set>.
+    Folders with labels and images are scanned only once.
+    mode: "copy", "hardlink", "symlink" or "reflink", see materialize_files.
+    """
+    labels_index = index_folder(path_to_labels)
+    images_index = index_folder(path_to_images)
+
+    dataset = list(labels_index)
     if test_size is None:
-        train, val = split_dataset_train_val_test(dataset, train_size=train_size)
-        copy_files(path_to_folder=path_to_labels, file_names=train, destination_folder=os.path.join(destination_path, "labels", "train"))
-        copy_files(path_to_folder=path_to_labels, file_names=val, destination_folder=os.path.join(destination_path, "labels", "val"))
-        copy_files(path_to_folder=path_to_images, file_names=train, destination_folder=os.path.join(destination_path, "images", "train"))
-        copy_files(path_to_folder=path_to_images, file_names=val, destination_folder=os.path.join(destination_path, "images", "val"))
+        train, val = split_dataset_train_val_test(dataset, train_size=train_size, seed=seed)
+        splits = {"train": train, "val": val}
     else:
-        train, val, test = split_dataset_train_val_test(dataset, train_size=train_size, test_size=test_size)
-        copy_files(path_to_folder=path_to_labels, file_names=train, destination_folder=os.path.join(destination_path, "labels", "train"))
-        copy_files(path_to_folder=path_to_labels, file_names=val, destination_folder=os.path.join(destination_path, "labels", "val"))
-        copy_files(path_to_folder=path_to_labels, file_names=test, destination_folder=os.path.join(destination_path, "labels", "test"))
+        train, val, test = split_dataset_train_val_test(dataset, train_size=train_size, test_size=test_size, seed=seed)
+        splits = {"train": train, "val": val, "test": test}
+
+    bytes_avoided = 0
+    for split_name, file_names in splits.items():
+        bytes_avoided += materialize_files(path_to_folder=path_to_labels, file_names=file_names,
+                                           destination_folder=os.path.join(destination_path, "labels", split_name),
+                                           mode=mode, folder_index=labels_index)
+        bytes_avoided += materialize_files(path_to_folder=path_to_images, file_names=file_names,
+                                           destination_folder=os.path.join(destination_path, "images", split_name),
+                                           mode=mode, folder_index=images_index)
 
-        copy_files(path_to_folder=path_to_images, file_names=train, destination_folder=os.path.join(destination_path, "images", "train"))
-        copy_files(path_to_folder=path_to_images, file_names=val, destination_folder=os.path.join(destination_path, "images", "val"))
-        copy_files(path_to_folder=path_to_images, file_names=test, destination_folder=os.path.join(destination_path, "images", "test"))
+    print(f"Dataset split to {destination_path}, {bytes_avoided / 2**20:.1f} MiB were not copied")
 
 
 def plot_classes_presence(path_to_folder: str, path_to_class_mapping: str, plot: bool=True, returns: bool=True) -> None | dict:
     """
-    Function plots histogram showing presence of diffrent classes in the set and returns number of .
+    Function plots histogram showing presence of diffrent classes in the set and returns number of instances of every class.
+    Labels are counted with label_index.LabelIndex, so only label files changed since the last call are parsed again.
     path_to_folder: path to folder where labels for classes is stored,
     all files has to be .txt files foemated for YOLOv8 model.
     path_to_class_mapping: path to .json file mapping class id to class name.
@@ -96,16 +209,11 @@ def plot_classes_presence(path_to_folder: str, path_to_class_mapping: str, plot:
     with open(path_to_class_mapping, "r", encoding="utf-8") as file:
         class_mapping: dict = json.load(file)
 
-    os.chdir(path_to_folder)
+    class_counts = LabelIndex(path_to_folder).statistics(number_of_classes=len(class_mapping))["class_counts"]
 
-    classes_presence: dict[str: int] = {class_name: 0 for class_name in class_mapping.values()}
+    classes_presence: dict[str: int] = {class_name: int(class_counts[int(class_id)])
+                                        for class_id, class_name in class_mapping.items()}
 
-    for file in os.listdir(path_to_folder):
-        with open(file, "r", encoding="utf-8") as f:
-            for line in f.readlines():
-                if line:
-                    classes_presence[class_mapping[line[0]]] += 1
-    
     if plot:
         classes = classes_presence.keys()
         values = classes_presence.values()
@@ -2,6 +2,9 @@ import xml.etree.ElementTree as ET
 from dataclasses import dataclass
 
 
+BOX_TAGS = ("xmin", "ymin", "xmax", "ymax")
+
+
 @dataclass
 class LabeledObject:
     class_id: int
@@ -75,3 +78,69 @@ class XMLParser:
 
         self.__refresh()
 
+
+def parse_annotation(filepath: str) -> tuple[int, int, list[tuple[str, int, int, int, int]]]:
+    """
+    Function parses .xml annotation incrementally with iterparse, children of the root are removed after reading,
+    so the full tree is never built. Values are read only at their paths in the VOC layout (size/width, object/name,
+    object/bndbox/xmin and so on), so tags with the same names in other places, like names of object parts, are ignored.
+    return: tuple with image width, image height and list of objects (name, xmin, ymin, xmax, ymax).
+    """
+    width, height = None, None
+    objects = []
+    name, box = None, {}
+    path, root = [], None
+    for event, element in ET.iterparse(filepath, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            else:
+                path.append(element.tag)
+            continue
+
+        location = tuple(path)
+        if location == ("size", "width"):
+            width = int(element.text)
+        elif location == ("size", "height"):
+            height = int(element.text)
+        elif location == ("object", "name"):
+            name = element.text.strip()
+        elif len(location) == 3 and location[:2] == ("object", "bndbox") and location[2] in BOX_TAGS:
+            box[location[2]] = int(float(element.text))
+        elif location == ("object",):
+            objects.append((name, box["xmin"], box["ymin"], box["xmax"], box["ymax"]))
+            name, box = None, {}
+
+        if len(location) == 1:
+            root.clear() # Processed children of the root are not needed anymore
+        if path:
+            path.pop()
+
+    return width, height, objects
+
+
+def format_annotation(filepath: str, class_mapping: dict[str, int]=None) -> tuple[list[str], list[str]]:
+    """
+    Function converts objects of .xml annotation to lines in YOLOv8 format.
+    :param class_mapping: dict mapping class name to class id, objects of other classes are skipped.
+    If None, class id is the number in the class name minus one like in XMLParser.
+    return: tuple with list of label lines and list of class names of all objects in the file.
+    """
+    img_width, img_height, objects = parse_annotation(filepath)
+
+    lines = []
+    for name, xmin, ymin, xmax, ymax in objects:
+        if class_mapping is None:
+            class_id = int(name[1:])-1
+        elif name in class_mapping:
+            class_id = class_mapping[name]
+        else:
+            continue
+
+        center_x = (xmax+xmin)/2/img_width
+        center_y = (ymax+ymin)/2/img_height
+        width = (xmax-xmin)/img_width
+        height = (ymax-ymin)/img_height
+        lines.append(str(LabeledObject(class_id, center_x, center_y, width, height)))
+
+    return lines, [obj[0] for obj in objects]
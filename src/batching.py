@@ -0,0 +1,160 @@
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+from time import perf_counter
+from typing import Callable
+import numpy as np
+
+
+class DynamicBatcher:
+    """
+    Class used to collect concurrent requests into batches processed by one call of predict_batch function.
+    Batch is processed when it has max_batch_size requests or max_wait seconds passed since its first request.
+    Requests wait in a bounded queue, submit raises queue.Full when the queue is full.
+    """
+    def __init__(self, predict_batch: Callable[[list], list], max_batch_size: int=8, max_wait: float=0.01,
+                 max_queue_size: int=64, latency_window: int=1000):
+        """
+        :param predict_batch: function taking list of inputs and returning list of outputs in the same order.
+        :param max_batch_size: int maximum number of requests in one batch.
+        :param max_wait: float time in seconds to wait for more requests after the first request of a batch.
+        :param max_queue_size: int maximum number of requests waiting for processing.
+        :param latency_window: int number of last requests used to calculate latency percentiles.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size parameter has to be positive integer")
+
+        self.__predict_batch = predict_batch
+        self.__max_batch_size: int = max_batch_size
+        self.__max_wait: float = max_wait
+        self.__queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+
+        self.__lock = threading.Lock()
+        self.__latencies: deque = deque(maxlen=latency_window)
+        self.__batch_sizes: Counter = Counter()
+        self.__number_of_requests: int = 0
+        self.__number_of_rejected: int = 0
+
+        self.__stop_event = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self) -> None:
+        """Function starts the thread processing batches."""
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Function stops the thread processing batches after the current batch,
+        requests left in the queue fail with RuntimeError.
+        """
+        # Event is set under the lock of submit, so no request is added to the queue after it is drained
+        with self.__lock:
+            self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+        self.__fail_pending(RuntimeError("Batcher is stopped"))
+
+    def __fail_pending(self, error: Exception) -> None:
+        """
+        Function sets the exception to futures of all requests waiting in the queue.
+        """
+        while True:
+            try:
+                _, future, _ = self.__queue.get_nowait()
+            except queue.Empty:
+                return
+            future.set_exception(error)
+
+    def submit(self, item) -> Future:
+        """
+        Function adds request to the queue.
+        return: Future which result is the output of predict_batch for the item.
+        """
+        future = Future()
+        with self.__lock:
+            if self.__stop_event.is_set():
+                future.set_exception(RuntimeError("Batcher is stopped"))
+                return future
+            try:
+                self.__queue.put_nowait((item, future, perf_counter()))
+            except queue.Full as error:
+                self.__number_of_rejected += 1
+                future.set_exception(error)
+                raise
+        return future
+
+    @property
+    def metrics(self) -> dict:
+        """
+        Property returns number of processed and rejected requests, current queue size,
+        p50 and p95 latency in milliseconds and histogram of batch sizes.
+        """
+        with self.__lock:
+            latencies = np.array(self.__latencies) * 1000
+            batch_sizes = dict(sorted(self.__batch_sizes.items()))
+            number_of_requests = self.__number_of_requests
+            number_of_rejected = self.__number_of_rejected
+
+        number_of_batches = sum(batch_sizes.values())
+        return {
+            "requests": number_of_requests,
+            "rejected": number_of_rejected,
+            "queue_size": self.__queue.qsize(),
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "batches": number_of_batches,
+            "mean_batch_size": number_of_requests / number_of_batches if number_of_batches else None,
+            "batch_sizes": batch_sizes
+        }
+
+    def __collect_batch(self) -> list:
+        """
+        Function waits for the first request and then collects more requests until the batch is full or time is over.
+        """
+        try:
+            batch = [self.__queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = perf_counter() + self.__max_wait
+        while len(batch) < self.__max_batch_size:
+            timeout = deadline - perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.__queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def __run(self) -> None:
+        while not self.__stop_event.is_set():
+            batch = self.__collect_batch()
+            if not batch:
+                continue
+
+            items = [item for item, _, _ in batch]
+            try:
+                outputs = self.__predict_batch(items)
+            except Exception as error:
+                for _, future, _ in batch:
+                    future.set_exception(error)
+                continue
+
+            if len(outputs) != len(batch):
+                error = ValueError(f"predict_batch has to return one output for every input, "
+                                   f"got {len(outputs)} outputs for {len(batch)} inputs")
+                for _, future, _ in batch:
+                    future.set_exception(error)
+                continue
+
+            time_end = perf_counter()
+            with self.__lock:
+                self.__batch_sizes[len(batch)] += 1
+                self.__number_of_requests += len(batch)
+                self.__latencies.extend(time_end - time_submitted for _, _, time_submitted in batch)
+
+            for (_, future, _), output in zip(batch, outputs):
+                future.set_result(output)
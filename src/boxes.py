@@ -0,0 +1,90 @@
+import numpy as np
+
+
+def box_area(boxes: np.ndarray) -> np.ndarray:
+    """
+    Function returns areas of boxes in (x1, y1, x2, y2) format.
+    """
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Function returns matrix of IoU of every box from boxes1 with every box from boxes2.
+    :param boxes1: array of shape (n, 4) in (x1, y1, x2, y2) format.
+    :param boxes2: array of shape (m, 4) in (x1, y1, x2, y2) format.
+    return: array of shape (n, m).
+    """
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    union = box_area(boxes1)[:, None] + box_area(boxes2)[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Function performs non-maximum suppression, boxes overlapping a box with higher score
+    with IoU greater than iou_threshold are removed.
+    return: array of indices of kept boxes sorted by decreasing score.
+    """
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        ious = box_iou(boxes[best:best + 1], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Function performs non-maximum suppression separately for every class.
+    Boxes of different classes are shifted apart, so they never overlap, and suppressed in one call.
+    return: array of indices of kept boxes sorted by decreasing score.
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    offsets = classes.astype(boxes.dtype)[:, None] * (boxes.max() + 1)
+    return nms(boxes + offsets, scores, iou_threshold)
+
+
+def weighted_boxes_fusion(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray,
+                          iou_threshold: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function merges boxes of the same class overlapping with IoU greater than iou_threshold into one box.
+    Coordinates of the merged box are averaged with scores as weights, score of the merged box is the mean score.
+    return: tuple with arrays of merged boxes, scores and classes.
+    """
+    fused_boxes, fused_scores, fused_classes = [], [], []
+    for class_id in np.unique(classes):
+        class_boxes = boxes[classes == class_id]
+        class_scores = scores[classes == class_id]
+        order = np.argsort(-class_scores, kind="stable")
+
+        clusters: list[list[int]] = []
+        cluster_boxes = np.zeros((0, 4), dtype=np.float64)
+        for i in order:
+            if len(clusters):
+                ious = box_iou(class_boxes[i:i + 1], cluster_boxes)[0]
+                best = int(np.argmax(ious))
+                if ious[best] > iou_threshold:
+                    clusters[best].append(i)
+                    members = clusters[best]
+                    weights = class_scores[members]
+                    cluster_boxes[best] = weights @ class_boxes[members] / weights.sum()
+                    continue
+            clusters.append([i])
+            cluster_boxes = np.vstack([cluster_boxes, class_boxes[i]])
+
+        fused_boxes.append(cluster_boxes)
+        fused_scores.append(np.array([class_scores[members].mean() for members in clusters]))
+        fused_classes.append(np.full(len(clusters), class_id))
+
+    if not fused_boxes:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=classes.dtype)
+
+    return np.concatenate(fused_boxes), np.concatenate(fused_scores), np.concatenate(fused_classes)
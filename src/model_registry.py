@@ -0,0 +1,161 @@
+import os
+import json
+from collections import OrderedDict
+import yaml
+from ultralytics import YOLO
+from src.utils import PATH_TO_MODELS, PATH_TO_DATASETS
+
+
+MANIFEST_FILE_NAME = ".model_registry.json"
+
+
+class ModelRegistry:
+    """
+    Class used to index trained models from runs/detect and to give out loaded models.
+    Information about every run (class names, number of classes, image size, dataset, weights modification time)
+    is saved to a manifest file and parsed again only for runs whose files were changed.
+    Loaded models are kept in least recently used order, so repeated calls don't read weights again.
+    """
+    def __init__(self, path_to_models: str=PATH_TO_MODELS, path_to_datasets: str=PATH_TO_DATASETS,
+                 max_loaded_models: int=2, path_to_manifest: str=None):
+        if max_loaded_models < 1:
+            raise ValueError("max_loaded_models parameter has to be positive integer")
+
+        self.__path_to_models: str = path_to_models
+        self.__path_to_datasets: str = path_to_datasets
+        self.__path_to_manifest: str = path_to_manifest or os.path.join(path_to_models, MANIFEST_FILE_NAME)
+        self.__max_loaded_models: int = max_loaded_models
+
+        self.__runs: dict[str, dict] = {}
+        self.__loaded_models: OrderedDict = OrderedDict()
+        self.refresh()
+
+    @property
+    def model_names(self) -> list[str]:
+        """Property returns sorted list of names of all indexed models."""
+        return sorted(self.__runs)
+
+    def get_info(self, model_name: str) -> dict:
+        """
+        Function returns indexed information about the model.
+        return: dict with keys weights, weights_mtime, imgsz, dataset, nc, names and has_test_split.
+        """
+        if model_name not in self.__runs:
+            raise KeyError(f"Model {model_name} is not found in {self.__path_to_models}")
+        return self.__runs[model_name]
+
+    def get_model(self, model_name: str) -> YOLO:
+        """
+        Function returns loaded model, weights are read only if the model is not in the cache
+        or its weights were changed after loading.
+        """
+        info = self.get_info(model_name)
+        # Weights are checked on every call, so retrained weights are loaded without refresh of the whole index
+        weights_mtime = self.__get_mtime(info["weights"])
+        if weights_mtime is None:
+            raise FileNotFoundError(f"Weights of model {model_name} not found: {info['weights']}")
+        info["weights_mtime"] = weights_mtime
+
+        key = (model_name, weights_mtime)
+        model = self.__loaded_models.get(key)
+        if model is not None:
+            self.__loaded_models.move_to_end(key)
+            return model
+
+        model = YOLO(info["weights"])
+        self.__loaded_models[key] = model
+        while len(self.__loaded_models) > self.__max_loaded_models:
+            self.__loaded_models.popitem(last=False)
+
+        return model
+
+    def refresh(self) -> None:
+        """
+        Function updates index of runs, runs with unchanged files are taken from the manifest without reading them.
+        """
+        manifest = self.__read_manifest()
+        runs = {}
+        for run_name in os.listdir(self.__path_to_models):
+            path_to_run = os.path.join(self.__path_to_models, run_name)
+            path_to_args = os.path.join(path_to_run, "args.yaml")
+            if not run_name.startswith("train-") or not os.path.isfile(path_to_args):
+                continue
+
+            path_to_weights = os.path.join(path_to_run, "weights", "best.pt")
+            stamps = {"args_mtime": self.__get_mtime(path_to_args), "weights_mtime": self.__get_mtime(path_to_weights)}
+
+            info = manifest.get(run_name)
+            if info is None or any(info.get(key) != value for key, value in stamps.items()) \
+                    or self.__get_mtime(info["dataset"]) != info["dataset_mtime"]:
+                info = self.__index_run(path_to_args, path_to_weights)
+                info.update(stamps)
+            runs[run_name] = info
+
+        self.__runs = runs
+        if runs != manifest:
+            self.__write_manifest(runs)
+
+    def __index_run(self, path_to_args: str, path_to_weights: str) -> dict:
+        """
+        Function reads args.yaml of the run and data.yaml of its dataset.
+        """
+        with open(path_to_args, "r", encoding="utf-8") as file:
+            args = yaml.safe_load(file)
+
+        dataset_name = os.path.basename(os.path.split(args["data"])[0])
+        path_to_data = os.path.join(self.__path_to_datasets, dataset_name, "data.yaml")
+
+        info = {
+            "weights": path_to_weights,
+            "imgsz": args.get("imgsz"),
+            "dataset": path_to_data,
+            "dataset_mtime": self.__get_mtime(path_to_data),
+            "nc": None,
+            "names": None,
+            "has_test_split": False
+        }
+
+        if info["dataset_mtime"] is not None:
+            with open(path_to_data, "r", encoding="utf-8") as file:
+                data = yaml.safe_load(file)
+            info["nc"] = data.get("nc")
+            names = data.get("names", {})
+            if isinstance(names, list):
+                names = dict(enumerate(names))
+            info["names"] = {str(class_id): name for class_id, name in names.items()}
+            info["has_test_split"] = "test" in data
+
+        return info
+
+    @staticmethod
+    def __get_mtime(path: str) -> float | None:
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def __read_manifest(self) -> dict:
+        if not os.path.exists(self.__path_to_manifest):
+            return {}
+        try:
+            with open(self.__path_to_manifest, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def __write_manifest(self, runs: dict) -> None:
+        try:
+            with open(self.__path_to_manifest, "w", encoding="utf-8") as file:
+                json.dump(runs, file, indent=2)
+        except OSError:
+            pass # Registry still works without manifest if folder with models is read-only
+
+
+_REGISTRY: ModelRegistry = None
+
+
+def get_registry() -> ModelRegistry:
+    """
+    Function returns registry shared by the whole process, registry is created on the first call.
+    """
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = ModelRegistry()
+    return _REGISTRY
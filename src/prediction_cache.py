@@ -0,0 +1,130 @@
+import os
+import hashlib
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+from src.boxes import batched_nms
+from src.tiling import read_image_array, tiled_predictions_to_records
+
+
+PREDICTION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aircraft-classification", "predictions")
+CANDIDATE_CONF = 0.001 # Candidates with lower confidence are not stored, thresholds below it can't be answered from the cache
+MAX_CANDIDATES = 30000 # Same limit of boxes before NMS as in ultralytics
+CACHE_VERSION = 2 # Part of the key of entries, entries of older versions with float16 confidences are not read
+
+
+def hash_file(path: str) -> str:
+    """
+    Function returns sha1 hash of the file content.
+    """
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(2**20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class PredictionCache:
+    """
+    Class used to store candidate detections of models, so predictions with other confidence and IoU thresholds
+    are computed from the cache with NMS from src.boxes instead of running the model again.
+    Entries are .npz files keyed by hash of the image content, hash of the model weights and image size,
+    so renamed or copied images are found in the cache and retrained weights are not mixed with old ones.
+    Candidates are the output of model.predict with conf=candidate_conf, iou=1.0 and max_det=max_candidates:
+    only the best class of every box is kept, boxes with lower confidence are dropped and at most max_candidates
+    boxes with the highest confidence are stored. They are stored as float32 boxes in (x1, y1, x2, y2) format,
+    float32 confidences and uint16 class ids. Thresholds below candidate_conf can't be answered and raise ValueError.
+    """
+    def __init__(self, path_to_cache: str=PREDICTION_CACHE_DIR, candidate_conf: float=CANDIDATE_CONF,
+                 max_candidates: int=MAX_CANDIDATES):
+        self.__path_to_cache: str = path_to_cache
+        self.__candidate_conf: float = candidate_conf
+        self.__max_candidates: int = max_candidates
+        self.__weights_hashes: dict[tuple, str] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        os.makedirs(path_to_cache, exist_ok=True)
+
+    def __get_weights_hash(self, path_to_weights: str) -> str:
+        """
+        Function returns hash of the weights file, hash is computed again only if the file was changed.
+        """
+        stat = os.stat(path_to_weights)
+        key = (os.path.abspath(path_to_weights), stat.st_mtime_ns, stat.st_size)
+        if key not in self.__weights_hashes:
+            self.__weights_hashes[key] = hash_file(path_to_weights)
+        return self.__weights_hashes[key]
+
+    def __get_path_to_entry(self, path_to_image: str, path_to_weights: str, imgsz: int=None) -> str:
+        key = f"{CACHE_VERSION}-{hash_file(path_to_image)}-{self.__get_weights_hash(path_to_weights)}-{imgsz}"
+        key = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.__path_to_cache, key[:2], f"{key}.npz")
+
+    def get_candidates(self, model, path_to_weights: str, path_to_image: str,
+                       imgsz: int=None, **predict_kwargs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Function returns candidate detections of the model (see the class description), from the cache
+        or from the model, which are then cached.
+        :param model: ultralytics YOLO model loaded from path_to_weights.
+        :param imgsz: int inference image size, model default if None.
+        return: tuple with arrays of boxes in (x1, y1, x2, y2) format, confidences and class ids.
+        """
+        path_to_entry = self.__get_path_to_entry(path_to_image, path_to_weights, imgsz)
+        if os.path.exists(path_to_entry):
+            self.hits += 1
+            with np.load(path_to_entry) as entry:
+                return entry["boxes"], entry["scores"].astype(np.float32), entry["classes"].astype(np.int64)
+
+        self.misses += 1
+        if imgsz is not None:
+            predict_kwargs["imgsz"] = imgsz
+        # IoU threshold of 1 makes NMS of ultralytics keep all boxes, so only the confidence filter is applied
+        result = model.predict(source=path_to_image, conf=self.__candidate_conf, iou=1.0, max_det=self.__max_candidates,
+                               verbose=False, **predict_kwargs)[0]
+        boxes = result.boxes.xyxy.cpu().numpy().astype(np.float32)
+        scores = result.boxes.conf.cpu().numpy().astype(np.float32)
+        classes = result.boxes.cls.cpu().numpy().astype(np.uint16)
+
+        os.makedirs(os.path.dirname(path_to_entry), exist_ok=True)
+        path_to_temporary = f"{path_to_entry}.{os.getpid()}.tmp"
+        with open(path_to_temporary, "wb") as file:
+            np.savez_compressed(file, boxes=boxes, scores=scores, classes=classes)
+        os.replace(path_to_temporary, path_to_entry)
+
+        return boxes, scores, classes.astype(np.int64)
+
+    def predict(self, model, path_to_weights: str, path_to_image: str, conf: float=0.25, iou: float=0.5,
+                imgsz: int=None, max_det: int=300, **predict_kwargs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Function returns detections of the model with the given thresholds, computed from cached candidates
+        with class-aware NMS like model.predict.
+        return: tuple with arrays of boxes, confidences and class ids sorted by decreasing confidence.
+        """
+        if conf < self.__candidate_conf:
+            raise ValueError(f"conf has to be at least {self.__candidate_conf}, detections with lower confidence are not cached")
+
+        boxes, scores, classes = self.get_candidates(model, path_to_weights, path_to_image, imgsz, **predict_kwargs)
+        candidates = scores > conf
+        boxes, scores, classes = boxes[candidates], scores[candidates], classes[candidates]
+
+        keep = batched_nms(boxes, scores, classes, iou)[:max_det]
+        return boxes[keep], scores[keep], classes[keep]
+
+    def predict_records(self, model, path_to_weights: str, path_to_image: str, conf: float=0.25, iou: float=0.5,
+                        imgsz: int=None, **predict_kwargs) -> list[dict]:
+        """
+        Function returns detections as the same records as src.utils.extract_predictions.
+        """
+        boxes, scores, classes = self.predict(model, path_to_weights, path_to_image, conf, iou, imgsz, **predict_kwargs)
+        return tiled_predictions_to_records(boxes, scores, classes, model.names)
+
+    def predict_result(self, model, path_to_weights: str, path_to_image: str, conf: float=0.25, iou: float=0.5,
+                       imgsz: int=None, **predict_kwargs) -> Results:
+        """
+        Function returns detections as ultralytics Results object, so they can be plotted, saved and shown
+        like results of model.predict.
+        """
+        boxes, scores, classes = self.predict(model, path_to_weights, path_to_image, conf, iou, imgsz, **predict_kwargs)
+        image = np.ascontiguousarray(read_image_array(path_to_image)[..., ::-1]) # ultralytics plots on BGR images
+        data = np.column_stack([boxes, scores, classes]).astype(np.float32)
+        return Results(image, path=path_to_image, names=model.names, boxes=torch.from_numpy(data))
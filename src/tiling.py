@@ -0,0 +1,103 @@
+import numpy as np
+from PIL import Image
+from src.boxes import batched_nms, weighted_boxes_fusion
+from src.utils import make_prediction_record
+
+
+MERGE_METHODS = ("nms", "wbf")
+
+
+def tile_origins(length: int, tile_size: int, overlap: float) -> list[int]:
+    """
+    Function returns start coordinates of tiles along one side of an image.
+    Tiles overlap by the given fraction of tile size, the last tile ends exactly at the image border.
+    """
+    if length <= tile_size:
+        return [0]
+
+    stride = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: float) -> list[tuple[int, int]]:
+    """
+    Function returns list of (x, y) coordinates of top left corners of all tiles of an image.
+    """
+    return [(x, y) for y in tile_origins(height, tile_size, overlap) for x in tile_origins(width, tile_size, overlap)]
+
+
+def read_image_array(path_to_image: str) -> np.ndarray:
+    """
+    Function reads image into one RGB uint8 array, PIL image is released after conversion.
+    """
+    with Image.open(path_to_image) as image:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return np.asarray(image)
+
+
+def iter_tile_batches(image: np.ndarray, tiles: list[tuple[int, int]], tile_size: int, batch_size: int):
+    """
+    Function yields batches of tiles, tiles are cut from the image only when their batch is requested.
+    return: generator of tuples with list of tile origins and list of BGR tile arrays expected by ultralytics.
+    """
+    for i in range(0, len(tiles), batch_size):
+        origins = tiles[i:i + batch_size]
+        arrays = [np.ascontiguousarray(image[y:y + tile_size, x:x + tile_size, ::-1]) for x, y in origins]
+        yield origins, arrays
+
+
+def predict_tiled(model, path_to_image: str, tile_size: int=800, overlap: float=0.2, batch_size: int=8,
+                  conf: float=0.25, iou: float=0.5, merge: str="nms", **predict_kwargs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function detects planes on a large image by running the model on overlapping tiles in batches.
+    Boxes are moved to coordinates of the full image and duplicates on overlapping parts of tiles
+    are merged with class-aware NMS or weighted boxes fusion.
+    :param model: ultralytics YOLO model.
+    :param tile_size: int size of square tile in pixels, also used as inference image size.
+    :param overlap: float fraction of tile size by which neighbouring tiles overlap.
+    :param merge: "nms" or "wbf", method used to merge boxes from different tiles.
+    return: tuple with arrays of boxes in (x1, y1, x2, y2) format, confidences and class ids.
+    """
+    if merge not in MERGE_METHODS:
+        raise ValueError(f"Incorrect merge method, has to be one of {MERGE_METHODS}")
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap parameter has to be non-negative number less than one")
+
+    image = read_image_array(path_to_image)
+    height, width = image.shape[:2]
+    tiles = tile_grid(width, height, tile_size, overlap)
+
+    all_boxes, all_scores, all_classes = [], [], []
+    for origins, arrays in iter_tile_batches(image, tiles, tile_size, batch_size):
+        results = model.predict(source=arrays, imgsz=tile_size, conf=conf, iou=iou, batch=len(arrays),
+                                verbose=False, **predict_kwargs)
+        for (x, y), result in zip(origins, results):
+            if result.boxes is None or len(result.boxes) == 0:
+                continue
+            all_boxes.append(result.boxes.xyxy.cpu().numpy() + np.array([x, y, x, y], dtype=np.float32))
+            all_scores.append(result.boxes.conf.cpu().numpy())
+            all_classes.append(result.boxes.cls.cpu().numpy().astype(np.int64))
+
+    if not all_boxes:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
+    classes = np.concatenate(all_classes)
+
+    if merge == "wbf":
+        return weighted_boxes_fusion(boxes, scores, classes, iou)
+
+    keep = batched_nms(boxes, scores, classes, iou)
+    return boxes[keep], scores[keep], classes[keep]
+
+
+def tiled_predictions_to_records(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, class_names: dict) -> list[dict]:
+    """
+    Function converts merged tiled predictions to the same records as src.utils.extract_predictions.
+    """
+    return [make_prediction_record(class_names[int(class_id)], float(score), box.tolist())
+            for box, score, class_id in zip(boxes, scores, classes)]
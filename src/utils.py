@@ -1,10 +1,10 @@
 import os
 import sys
-from ultralytics import YOLO
 
 
 PATH_TO_MODELS = "/home/bohdan/code/projects/aircraft-classification/runs/detect"
 PATH_TO_IMAGES = "/home/bohdan/code/projects/aircraft-classification/test-images"
+PATH_TO_DATASETS = "/home/bohdan/code/projects/aircraft-classification/data/datasets"
 
 
 def get_path() -> str:
@@ -39,16 +39,50 @@ def get_images() -> list[str]:
 def choose_model():
     """
     Function asks user to chose model.
+    Model is taken from the model registry, so it is not loaded again if it was already used in this process.
     return: tuple with model object and name of a model.
     """
-    models = get_models()
+    from src.model_registry import get_registry
+
+    registry = get_registry()
+    models = registry.model_names
     print("Enter number to choose a model")
     print("\n".join(f"{i}: {model}" for i, model in enumerate(models, start=1)))
     model_name = models[int(input(">>> ").strip())-1]
-    model = YOLO(os.path.join(PATH_TO_MODELS, model_name, "weights/best.pt"))
+    model = registry.get_model(model_name)
     return model, model_name
 
 
+def extract_predictions(result, class_names: dict) -> list[dict]:
+    """
+    Function converts boxes of one YOLO result to list of records with class name, confidence and center coordinates.
+    :param result: ultralytics Results object of one image.
+    :param class_names: dict mapping class id to class name (model.names).
+    return: list of dicts with keys class_name, confidence and center_coordinates.
+    """
+    prediction_results = []
+    boxes = result.boxes
+    if boxes is not None:
+        for box in boxes:
+            class_id = int(box.cls[0])
+            confidence = float(box.conf[0])
+            prediction_results.append(make_prediction_record(class_names[class_id], confidence, box.xyxy[0].tolist()))
+    return prediction_results
+
+
+def make_prediction_record(class_name: str, confidence: float, xyxy: list[float]) -> dict:
+    """
+    Function makes record of one detected plane.
+    :param xyxy: list with x1, y1, x2, y2 coordinates of the box.
+    return: dict with keys class_name, confidence and center_coordinates.
+    """
+    x1, y1, x2, y2 = xyxy
+    center = (round((x1+x2)/2), round((y1+y2)/2))
+    return {"class_name": class_name,
+            "confidence": confidence,
+            "center_coordinates": center}
+
+
 def choose_image() -> str:
     """
     Function asks user to choose image to process.
@@ -1,30 +1,17 @@
-from ultralytics import YOLO
-from src.utils import choose_model, get_path
+from src.utils import choose_model
+from src.model_registry import get_registry
 import os
-import pathlib
-import yaml
-
-PATH_TO_REPOSITORY = "/home/bohdan/code/aircraft-classification"
-PATH_TO_DATASETS = "data/datasets"
 
 
 if __name__ == "__main__":
-    os.chdir(PATH_TO_REPOSITORY)
-
     model, model_name = choose_model()
-    path_to_model = os.path.join("runs", "detect", model_name, "weights", "best.pt")
-    path_to_args = os.path.join("runs", "detect", model_name, "args.yaml")
+    model_info = get_registry().get_info(model_name)
 
-    path_to_data = None
-    with open(path_to_args, "r", encoding="utf-8") as file:
-        path_to_data = yaml.safe_load(file)["data"]
-        path_to_data = os.path.split(path_to_data)[0]
-    path_to_data = os.path.join(PATH_TO_DATASETS, os.path.basename(path_to_data), "data.yaml")
-    
-    with open(path_to_data, "r", encoding="utf-8") as file:
-        content = yaml.safe_load(file)
-        if "test" not in content:
-            raise ValueError("Model doesn't have test set")
+    path_to_data = model_info["dataset"]
+    if model_info["dataset_mtime"] is None:
+        raise FileNotFoundError(f"Dataset of the model not found: {path_to_data}")
+    if not model_info["has_test_split"]:
+        raise ValueError("Model doesn't have test set")
 
     path_to_save = os.path.split(path_to_data)[0]
     results_folder_name = f"test-results-{model_name}"